@@ -1,6 +1,10 @@
+from __future__ import annotations
 import os
-import tkinter as tk
-from tkinter import ttk, messagebox
+try:
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+except ImportError:  # Headless hosts only run --agent mode
+    tk = ttk = messagebox = None
 import sys
 from typing import List, Dict, Tuple
 import threading
@@ -8,6 +12,2036 @@ from datetime import datetime
 import time
 import re
 import shutil
+import bisect
+import array
+import itertools
+import operator
+import struct
+import json
+import hashlib
+import hmac
+import tarfile
+import zipfile
+import atexit
+from typing import Optional
+
+def _remove_temp(path: str):
+    """Deletes a spill file or directory if it is still there (registered with atexit)"""
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _hash_stream(stream, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a binary stream, read in fixed-size chunks"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def _create_archive_file(file_path: str, archive_format: str):
+    """Exclusively creates a new archive next to file_path, never reusing an existing name
+
+    Returns (archive_path, open binary file).
+    """
+    archive_path = f"{file_path}.{archive_format}"
+    counter = 1
+    while True:
+        try:
+            return archive_path, open(archive_path, 'xb')
+        except FileExistsError:
+            archive_path = f"{file_path}.{counter}.{archive_format}"
+            counter += 1
+
+def archive_file(file_path: str, archive_format: str = "tar.xz") -> Tuple[str, int, int]:
+    """Compresses one file next to itself, verifies the archive, then deletes the original
+
+    Runs in a worker process. Returns (archive_path, original_bytes, archive_bytes).
+    Only the archive this call created is ever removed on failure.
+    """
+    original_size = os.path.getsize(file_path)
+    member_name = os.path.basename(file_path)
+    archive_path, archive_out = _create_archive_file(file_path, archive_format)
+
+    try:
+        # Both writers stream the source in chunks, so memory stays bounded
+        with archive_out:
+            if archive_format == "zip":
+                with zipfile.ZipFile(archive_out, 'w', zipfile.ZIP_DEFLATED) as archive:
+                    archive.write(file_path, member_name)
+            else:
+                with tarfile.open(fileobj=archive_out, mode='w:xz') as archive:
+                    archive.add(file_path, member_name)
+
+        if archive_format == "zip":
+            with zipfile.ZipFile(archive_path) as archive, archive.open(member_name) as member:
+                archived_hash = _hash_stream(member)
+        else:
+            with tarfile.open(archive_path, 'r:xz') as archive:
+                archived_hash = _hash_stream(archive.extractfile(member_name))
+
+        with open(file_path, 'rb') as original:
+            if _hash_stream(original) != archived_hash:
+                raise OSError(f"Archive verification failed for {file_path}")
+    except Exception:
+        os.remove(archive_path)
+        raise
+
+    os.remove(file_path)
+    return archive_path, original_size, os.path.getsize(archive_path)
+
+class ResultIndex:
+    """Search index over scan results, built incrementally during the scan
+
+    Recent rows live in memory with an extension map, basename/directory
+    trigram postings and size/mtime columns sorted as rows arrive. Postings and
+    columns are compact arrays of in-memory positions (row id - base), and
+    searches walk the most selective term's candidates newest first, so a
+    limited search stops as soon as it has enough rows. When the scan's
+    memory budget runs out, spill() moves them into an indexed SQLite table
+    in a temporary file; queries then combine the in-memory rows with SQL
+    over the spilled ones. Row ids are global and increase with insertion
+    order, so spilled rows always have smaller ids than in-memory ones.
+    """
+
+    # Comparison operators accepted in size/age query terms
+    OPERATORS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt,
+                 '<=': operator.le, '=': operator.eq}
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spill_lock = threading.Lock()  # one spill at a time
+        self.spill_path = None
+        self.spill_conn = None  # reads, and deletes outside a spill
+        self.spill_writer = None  # writes spilled rows
+        self.spill_fts = False  # spilled paths have a trigram index
+        self.clear()
+
+    def clear(self):
+        """Drops all indexed rows, including anything spilled to disk"""
+        with self.spill_lock, self.lock:
+            self.base = 0  # global id of the first in-memory row
+            self.spilled_live = 0  # spilled rows not yet discarded
+            self.spilling = False  # a spill is writing rows
+            self.spill_deletes = []  # spilled paths discarded while it writes
+            self._reset_memory()
+            for conn in (self.spill_conn, self.spill_writer):
+                if conn is not None:
+                    conn.close()
+            self.spill_conn = self.spill_writer = None
+            if self.spill_path:
+                for suffix in ("", "-wal", "-shm", "-journal"):
+                    if os.path.exists(self.spill_path + suffix):
+                        os.remove(self.spill_path + suffix)
+                self.spill_path = None
+
+    def _reset_memory(self):
+        """Starts an empty in-memory index (lock must be held)"""
+        self.paths = []
+        self.sizes = array.array('d')  # MB
+        self.mtimes = array.array('d')  # last use: mtime, or the last tracked open
+        self.reasons = []
+        self.ext_map = {}  # ".iso" -> array of positions
+        self.name_grams = {}  # basename trigram -> array of positions
+        self.dir_ids = {}  # directory -> dir id
+        self.dirs = []  # dir id -> directory
+        self.dir_rows = []  # dir id -> array of positions
+        self.dir_grams = {}  # directory trigram -> array of dir ids
+        self.removed = set()  # in-memory row ids of files that were deleted, moved or archived
+        self._removed_sorted = None
+        self._sorted_cache = {}
+
+    @staticmethod
+    def trigrams(text: str) -> set:
+        """Returns the set of 3-character substrings of text"""
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    @staticmethod
+    def _post(postings: dict, key, value: int):
+        """Appends value to the postings array stored under key"""
+        posting = postings.get(key)
+        if posting is None:
+            posting = postings[key] = array.array('I')
+        posting.append(value)
+
+    def add(self, file_path: str, size_mb: float, mtime: float, reason: str):
+        """Indexes one recommendation"""
+        with self.lock:
+            self._append(file_path, size_mb, mtime, reason)
+
+    def _append(self, file_path: str, size_mb: float, mtime: float, reason: str):
+        """Adds one row to the in-memory index (lock must be held)"""
+        directory, file_name = os.path.split(file_path.lower())
+        ext = os.path.splitext(file_name)[1]
+
+        position = len(self.paths)
+        self.paths.append(file_path)
+        self.sizes.append(size_mb)
+        self.mtimes.append(mtime)
+        self.reasons.append(reason)
+
+        self._post(self.ext_map, ext, position)
+        for gram in self.trigrams(file_name):
+            self._post(self.name_grams, gram, position)
+
+        # Directories are shared by many files, so index each one only once
+        dir_id = self.dir_ids.get(directory)
+        if dir_id is None:
+            dir_id = len(self.dir_rows)
+            self.dir_ids[directory] = dir_id
+            self.dirs.append(directory)
+            self.dir_rows.append(array.array('I'))
+            for gram in self.trigrams(directory):
+                self._post(self.dir_grams, gram, dir_id)
+        self.dir_rows[dir_id].append(position)
+
+    def spill(self):
+        """Moves every in-memory row to the on-disk table and frees the in-memory index
+
+        The rows are written through a second connection while searches keep
+        finding them in memory; the table is in WAL mode, so readers only see
+        them once committed. Only the commit and the swap to a fresh in-memory
+        index hold the lock.
+        """
+        with self.spill_lock:
+            with self.lock:
+                count = len(self.paths)
+                if not count:
+                    return
+                base, removed = self.base, set(self.removed)
+                paths, sizes, mtimes, reasons = self.paths, self.sizes, self.mtimes, self.reasons
+                writer = self._spill_db()
+                self.spilling = True
+            try:
+                # Positions below count never change, so they can be read without the lock
+                live = [i for i in range(count) if base + i not in removed]
+                writer.execute("BEGIN")
+                writer.executemany(
+                    "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        (base + i, paths[i], *os.path.split(paths[i].lower())[::-1],
+                         os.path.splitext(paths[i].lower())[1], sizes[i], mtimes[i], reasons[i])
+                        for i in live
+                    )
+                )
+                if self.spill_fts:
+                    writer.executemany(
+                        "INSERT INTO results_text (rowid, text) VALUES (?, ?)",
+                        ((base + i, paths[i].lower()) for i in live)
+                    )
+            except BaseException:
+                with self.lock:
+                    if writer.in_transaction:
+                        writer.execute("ROLLBACK")
+                    self.spilled_live -= self._finish_spill(writer)
+                raise
+
+            with self.lock:
+                # Rows discarded while they were being written
+                late = [row for row in self.removed if base <= row < base + count and row not in removed]
+                deleted = sum(writer.execute("DELETE FROM results WHERE id = ?", (row,)).rowcount
+                              for row in late)
+                deleted += self._finish_spill(writer)
+                writer.execute("COMMIT")
+                self.spilled_live += len(live) - deleted
+
+                # Keep rows added meanwhile in the fresh in-memory index, under the same ids
+                added = [(self.paths[i], self.sizes[i], self.mtimes[i], self.reasons[i])
+                         for i in range(count, len(self.paths))]
+                removed = {row for row in self.removed if row >= base + count}
+                self.base = base + count
+                self._reset_memory()
+                for record in added:
+                    self._append(*record)
+                self.removed = removed
+            writer.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def _finish_spill(self, writer) -> int:
+        """Ends a spill, applying the discards it deferred; returns the rows deleted (lock must be held)"""
+        self.spilling = False
+        deletes, self.spill_deletes = self.spill_deletes, []
+        return sum(writer.execute("DELETE FROM results WHERE path = ?", (path,)).rowcount
+                   for path in deletes)
+
+    def _spill_db(self):
+        """Opens the spill table, returning the connection that writes it"""
+        if self.spill_conn is None:
+            import sqlite3
+            import tempfile
+            fd, self.spill_path = tempfile.mkstemp(prefix="smartdisk_results_", suffix=".db")
+            os.close(fd)
+            for suffix in ("", "-wal", "-shm"):
+                atexit.register(_remove_temp, self.spill_path + suffix)
+            self.spill_conn = sqlite3.connect(self.spill_path, check_same_thread=False)
+            # Checkpoints run after each spill, outside the lock
+            self.spill_conn.executescript(
+                "PRAGMA journal_mode=WAL;"
+                "PRAGMA synchronous=OFF;"
+                "PRAGMA wal_autocheckpoint=0;"
+                "CREATE TABLE results (id INTEGER PRIMARY KEY, path TEXT, name TEXT, dir TEXT,"
+                " ext TEXT, size_mb REAL, mtime REAL, reason TEXT);"
+                "CREATE INDEX results_path ON results (path);"
+                "CREATE INDEX results_ext ON results (ext);"
+                "CREATE INDEX results_size ON results (size_mb);"
+                "CREATE INDEX results_mtime ON results (mtime);"
+            )
+            # Lowercased paths by trigram, for text terms; needs SQLite built with FTS5
+            try:
+                self.spill_conn.execute(
+                    "CREATE VIRTUAL TABLE results_text USING fts5("
+                    "text, tokenize='trigram', content='', detail='none')")
+                self.spill_fts = True
+            except sqlite3.OperationalError:
+                self.spill_fts = False
+            self.spill_writer = sqlite3.connect(
+                self.spill_path, check_same_thread=False, isolation_level=None)
+            self.spill_writer.executescript("PRAGMA synchronous=OFF; PRAGMA wal_autocheckpoint=0;")
+        return self.spill_writer
+
+    def discard(self, file_path: str):
+        """Hides a file from future searches"""
+        with self.lock:
+            self.removed.update(
+                self.base + i for i in self.ext_map.get(os.path.splitext(file_path.lower())[1], ())
+                if self.paths[i] == file_path
+            )
+            self._removed_sorted = None
+            if self.spilling:
+                # The spill holds the write transaction and deletes these on commit
+                self.spill_deletes.append(file_path)
+            elif self.spill_conn is not None:
+                with self.spill_conn:
+                    deleted = self.spill_conn.execute(
+                        "DELETE FROM results WHERE path = ?", (file_path,)).rowcount
+                self.spilled_live -= deleted
+
+    def __len__(self):
+        """Number of rows ever added, including discarded ones"""
+        return self.base + len(self.paths)
+
+    def live_count(self) -> int:
+        """Number of rows that have not been discarded"""
+        return self.spilled_live + len(self.paths) - len(self.removed)
+
+    def row(self, row: int) -> Tuple[str, float, float, str]:
+        """Returns (file_path, size_mb, mtime, reason) for a row id"""
+        if row >= self.base:
+            i = row - self.base
+            return self.paths[i], self.sizes[i], self.mtimes[i], self.reasons[i]
+        with self.lock:
+            return self.spill_conn.execute(
+                "SELECT path, size_mb, mtime, reason FROM results WHERE id = ?", (row,)).fetchone()
+
+    def nth(self, position: int) -> Tuple[str, float, float, str]:
+        """Returns the position-th live row in insertion order, paging it in from disk if spilled"""
+        if position < 0:
+            position += self.live_count()
+        if position < self.spilled_live:
+            with self.lock:
+                return self.spill_conn.execute(
+                    "SELECT path, size_mb, mtime, reason FROM results ORDER BY id LIMIT 1 OFFSET ?",
+                    (position,)).fetchone()
+
+        # Skip over discarded in-memory rows
+        position -= self.spilled_live
+        with self.lock:
+            if self._removed_sorted is None:
+                self._removed_sorted = sorted(r - self.base for r in self.removed)
+            removed = self._removed_sorted
+        low, high = position, position + len(removed)
+        while low < high:
+            mid = (low + high) // 2
+            if mid - bisect.bisect_right(removed, mid) < position:
+                low = mid + 1
+            else:
+                high = mid
+        if low >= len(self.paths):
+            raise IndexError("result index out of range")
+        return self.row(self.base + low)
+
+    def iter_rows(self, start: int = 0, page_size: int = 1000):
+        """Yields (row id, file_path, size_mb, mtime, reason) for live rows from id start on"""
+        while start < self.base and self.spill_conn is not None:
+            with self.lock:
+                page = self.spill_conn.execute(
+                    "SELECT id, path, size_mb, mtime, reason FROM results WHERE id >= ? "
+                    "ORDER BY id LIMIT ?", (start, page_size)).fetchall()
+            if not page:
+                break
+            yield from page
+            start = page[-1][0] + 1
+        for row in range(max(start, self.base), len(self)):
+            if row not in self.removed:
+                record = self.row(row)
+                if record:
+                    yield (row,) + tuple(record)
+
+    def iter_sorted(self, column: str = "size_mb", descending: bool = True, page_size: int = 1000):
+        """Yields (row id, file_path, size_mb, mtime, reason) ordered by size_mb or mtime
+
+        The in-memory rows and the spilled table are each read in order and merged.
+        """
+        import heapq
+
+        def spilled():
+            if self.spill_conn is None:
+                return
+            offset = 0
+            while True:
+                with self.lock:
+                    page = self.spill_conn.execute(
+                        f"SELECT id, path, size_mb, mtime, reason FROM results "
+                        f"ORDER BY {column} {'DESC' if descending else 'ASC'} LIMIT ? OFFSET ?",
+                        (page_size, offset)).fetchall()
+                if not page:
+                    return
+                yield from page
+                offset += len(page)
+
+        with self.lock:
+            base = self.base
+            _, order, sorted_count = self._sorted_by("size" if column == "size_mb" else "mtime")
+            # Rows that arrived after the last sort are few; sort them separately and merge
+            values = self.sizes if column == "size_mb" else self.mtimes
+            tail = sorted(range(sorted_count, len(values)), key=values.__getitem__)
+        if descending:
+            order, tail = reversed(order), reversed(tail)
+        in_order = heapq.merge(order, tail, key=values.__getitem__, reverse=descending)
+        in_memory = ((base + i,) + self.row(base + i) for i in in_order if base + i not in self.removed)
+        key_index = 2 if column == "size_mb" else 3
+        yield from heapq.merge(in_memory, spilled(), key=lambda r: r[key_index], reverse=descending)
+
+    def _sorted_by(self, name: str) -> Tuple[array.array, array.array, int]:
+        """Returns (sorted values, positions, count) for the size or mtime column
+
+        Only the first count positions are sorted. Rows added since then are
+        left for callers to check directly until they make up a sixteenth of
+        the column; the next call sorts just those rows and splices them into
+        the sorted arrays at their bisect positions instead of re-sorting.
+        """
+        column = self.sizes if name == "size" else self.mtimes
+        values, order, count = self._sorted_cache.get(name, (array.array('d'), array.array('I'), 0))
+        if len(column) - count > max(4096, count // 16):
+            values, order = self._merge_sorted(column, values, order, count, len(column))
+            count = len(column)
+            self._sorted_cache[name] = (values, order, count)
+        return values, order, count
+
+    @staticmethod
+    def _merge_sorted(column: array.array, values: array.array, order: array.array,
+                      count: int, length: int) -> Tuple[array.array, array.array]:
+        """Splices positions count..length of column into the sorted (values, order) arrays"""
+        tail = sorted(range(count, length), key=column.__getitem__)
+        if not count:
+            return array.array('d', map(column.__getitem__, tail)), array.array('I', tail)
+
+        merged_values, merged_order = array.array('d'), array.array('I')
+        start = 0
+        for i in tail:
+            value = column[i]
+            end = bisect.bisect_right(values, value, start)
+            merged_values += values[start:end]
+            merged_order += order[start:end]
+            merged_values.append(value)
+            merged_order.append(i)
+            start = end
+        merged_values += values[start:]
+        merged_order += order[start:]
+        return merged_values, merged_order
+
+    def presort(self):
+        """Brings the sorted size/mtime columns up to date; called by the scan as rows arrive
+
+        Keeps the first size or age search from sorting the whole column. The
+        merge works on a snapshot of the column length outside the lock, since
+        positions below it never change, so searches aren't held up meanwhile.
+        """
+        for name in ("size", "mtime"):
+            with self.lock:
+                column = self.sizes if name == "size" else self.mtimes
+                values, order, count = self._sorted_cache.get(
+                    name, (array.array('d'), array.array('I'), 0))
+                length = len(column)
+            if length - count <= max(4096, count // 16):
+                continue
+            values, order = self._merge_sorted(column, values, order, count, length)
+            with self.lock:
+                # Skip the update if a spill replaced the column or a search sorted further
+                current = self._sorted_cache.get(name, (None, None, 0))[2]
+                if column is (self.sizes if name == "size" else self.mtimes) and current < length:
+                    self._sorted_cache[name] = (values, order, length)
+
+    def _parse_term(self, term: str) -> Tuple[str, str, object]:
+        """Splits a query term into (kind, operator, value) with kind size, mtime, ext or text"""
+        match = re.fullmatch(r'(size|age)\s*(>=|<=|>|<|=)\s*([\d.]+)\s*(kb|mb|gb|d)?', term)
+        if match:
+            field, op, number, unit = match.groups()
+            value = float(number)
+            if field == 'size':
+                value *= {'kb': 1 / 1024, 'gb': 1024}.get(unit, 1)
+                return 'size', op, value
+
+            # Age is measured in days, so compare against the opposite mtime bound
+            cutoff = time.time() - value * 24 * 3600
+            flipped = {'>': '<', '>=': '<=', '<': '>', '<=': '>='}.get(op, op)
+            return 'mtime', flipped, cutoff
+
+        if term.startswith(('ext:', '*.')) or re.fullmatch(r'\.\w+', term):
+            return 'ext', '=', '.' + term.split(':', 1)[-1].lstrip('*.')
+
+        return 'text', '', term
+
+    def validate(self, query: str):
+        """Raises ValueError if any term of query is malformed"""
+        for term in query.lower().split():
+            self._parse_term(term)
+
+    def _term_test(self, kind: str, op: str, value):
+        """Returns a predicate telling whether an in-memory position satisfies a parsed term"""
+        if kind in ('size', 'mtime'):
+            column, compare = (self.sizes if kind == 'size' else self.mtimes), self.OPERATORS[op]
+            return lambda i: compare(column[i], value)
+        paths = self.paths
+        if kind == 'ext':
+            return lambda i: os.path.splitext(paths[i].lower())[1] == value
+        # Text may match anywhere in the path, including across the last separator
+        return lambda i: value in paths[i].lower()
+
+    @staticmethod
+    def _split_at_separator(text: str) -> Tuple[str, str]:
+        """Splits text at its last path separator into (head, tail); head is None without one"""
+        cut = max(text.rfind(os.sep), text.rfind(os.altsep) if os.altsep else -1)
+        if cut < 0:
+            return None, text
+        return text[:cut], text[cut + 1:]
+
+    def _dirs_containing(self, text: str) -> List[int]:
+        """Ids of indexed directories containing text (at least 3 characters)"""
+        posting = min((self.dir_grams.get(g, ()) for g in self.trigrams(text)), key=len)
+        return [dir_id for dir_id in posting if text in self.dirs[dir_id]]
+
+    def _name_posting(self, text: str):
+        """Smallest basename trigram posting for text; a superset of the basenames containing it"""
+        return min((self.name_grams.get(g, ()) for g in self.trigrams(text)), key=len)
+
+    def _term_source(self, kind: str, op: str, value, test):
+        """Plans how to enumerate the in-memory positions matching one term
+
+        Returns (estimate, exact, candidates) where estimate bounds the number
+        of matches, exact says whether estimate is the true count, and
+        candidates(ordered) yields every matching position, newest first when
+        ordered is true.
+        """
+        n = len(self.paths)
+        if kind in ('size', 'mtime'):
+            values, order, count = self._sorted_by(kind)
+            if op in ('>', '>='):
+                low, high = (bisect.bisect_right if op == '>' else bisect.bisect_left)(values, value), count
+            elif op in ('<', '<='):
+                low, high = 0, (bisect.bisect_left if op == '<' else bisect.bisect_right)(values, value)
+            else:
+                low, high = bisect.bisect_left(values, value), bisect.bisect_right(values, value)
+            tail = [i for i in range(count, n) if test(i)]
+
+            def candidates(ordered):
+                if ordered:
+                    return iter(sorted(itertools.chain(order[low:high], tail), reverse=True))
+                return itertools.chain(order[low:high], tail)
+            return high - low + len(tail), True, candidates
+
+        if kind == 'ext':
+            posting = self.ext_map.get(value, ())
+            return len(posting), True, lambda ordered: reversed(posting) if ordered else iter(posting)
+
+        paths = self.paths
+
+        def linear(ordered):
+            rows = zip(range(n - 1, -1, -1), reversed(paths)) if ordered else enumerate(paths)
+            return (i for i, path in rows if value in path.lower())
+
+        if len(value) < 3:
+            # Too short for trigrams, fall back to a linear scan
+            return n, False, linear
+
+        # Every row of a directory containing the whole term matches
+        dir_ids = self._dirs_containing(value)
+        head, tail = self._split_at_separator(value)
+        if head is None:
+            # Otherwise the term lies within the basename
+            posting = self._name_posting(value)
+            spanning = len(posting), lambda: posting
+        else:
+            # Otherwise it crosses the last separator: the directory ends with head
+            # and the basename starts with tail. Use whichever side is narrower.
+            sides = []
+            if len(tail) >= 3:
+                posting = self._name_posting(tail)
+                sides.append((len(posting), lambda: posting))
+            if len(head) >= 3:
+                head_dirs = [dir_id for dir_id in self._dirs_containing(head)
+                             if self.dirs[dir_id].endswith(head)]
+                sides.append((sum(len(self.dir_rows[dir_id]) for dir_id in head_dirs),
+                              lambda: sorted(itertools.chain.from_iterable(
+                                  self.dir_rows[dir_id] for dir_id in head_dirs))))
+            if not sides:
+                return n, False, linear
+            spanning = min(sides, key=lambda side: side[0])
+        estimate = spanning[0] + sum(len(self.dir_rows[dir_id]) for dir_id in dir_ids)
+
+        def candidates(ordered):
+            # Trigram candidates still need checking against the full path
+            rows = spanning[1]()
+            names = filter(test, reversed(rows) if ordered else rows)
+            if not dir_ids:
+                return names
+            in_dirs = itertools.chain.from_iterable(self.dir_rows[dir_id] for dir_id in dir_ids)
+            rows = set(names)
+            rows.update(in_dirs)
+            return iter(sorted(rows, reverse=True)) if ordered else iter(rows)
+        return estimate, False, candidates
+
+    def _plan(self, parsed: list, tests: list) -> list:
+        """Returns (estimate, exact, candidates, test) per parsed term, most selective first"""
+        plan = [self._term_source(*term, test) + (test,) for term, test in zip(parsed, tests)]
+        return sorted(plan, key=lambda step: step[0])
+
+    def _iter_memory(self, terms: List[str], limit: Optional[int] = None):
+        """Yields in-memory row ids matching every term, newest first (lock must be held)
+
+        A limited search first checks the newest rows one by one, which fills
+        the page of a broad query without touching any index. Otherwise the
+        term with the fewest candidates drives the walk and the remaining
+        terms are checked row by row.
+        """
+        n, base, removed = len(self.paths), self.base, self.removed
+        if not terms:
+            yield from (base + i for i in range(n - 1, -1, -1) if base + i not in removed)
+            return
+
+        parsed = [self._parse_term(term) for term in terms]
+        tests = [self._term_test(*term) for term in parsed]
+        stop = n
+        if limit is not None:
+            stop = max(n - 8 * limit, 0)
+            for i in range(n - 1, stop - 1, -1):
+                if base + i not in removed and all(test(i) for test in tests):
+                    yield base + i
+            if not stop:
+                return
+
+        plan = self._plan(parsed, tests)
+        _, _, candidates, _ = plan[0]
+        others = [test for _, _, _, test in plan[1:]]
+        for i in itertools.dropwhile(lambda i: i >= stop, candidates(True)):
+            if base + i not in removed and all(test(i) for test in others):
+                yield base + i
+
+    def _memory_count(self, terms: List[str]) -> int:
+        """Number of live in-memory rows matching every term (lock must be held)"""
+        if not terms:
+            return len(self.paths) - len(self.removed)
+        parsed = [self._parse_term(term) for term in terms]
+        plan = self._plan(parsed, [self._term_test(*term) for term in parsed])
+        estimate, exact, candidates, test = plan[0]
+        if len(plan) == 1 and exact:
+            # Counted from bisect positions or posting lengths; only removed rows need checking
+            return estimate - sum(1 for row in self.removed if test(row - self.base))
+
+        rows = set(candidates(False))
+        for _, exact, candidates, test in plan[1:]:
+            if exact:
+                rows.intersection_update(candidates(False))
+            else:
+                rows = set(filter(test, rows))
+        return len(rows) - sum(1 for row in self.removed if row - self.base in rows)
+
+    def _spilled_query(self, terms: List[str]) -> Tuple[str, str, str, list]:
+        """Translates query terms into (tables, id column, WHERE clause, params) over the spilled table
+
+        Text terms of 3 or more characters also match the trigram index on
+        the paths. The query is then driven by that index in rowid order, so
+        a limited search reads only the candidates it needs instead of
+        scanning the table.
+        """
+        clauses, params, grams = [], [], set()
+        for term in terms:
+            kind, op, value = self._parse_term(term)
+            if kind == 'size':
+                clauses.append(f"size_mb {op} ?")
+            elif kind == 'mtime':
+                clauses.append(f"mtime {op} ?")
+            elif kind == 'ext':
+                clauses.append("ext = ?")
+            else:
+                if self.spill_fts and len(value) >= 3:
+                    # The trigrams only narrow the candidates; the clauses below confirm them
+                    grams.update(self.trigrams(value))
+                if self._split_at_separator(value)[0] is not None:
+                    # May cross the last separator, so match the whole path
+                    clauses.append("instr(lower(path), ?) > 0")
+                else:
+                    clauses.append("(instr(name, ?) > 0 OR instr(dir, ?) > 0)")
+                    params.append(value)
+            params.append(value)
+        if grams:
+            match = " AND ".join('"%s"' % gram.replace('"', '""') for gram in sorted(grams))
+            return ("results_text CROSS JOIN results ON results.id = results_text.rowid",
+                    "results_text.rowid", " AND ".join(["results_text MATCH ?"] + clauses),
+                    [match] + params)
+        return "results", "id", " AND ".join(clauses) or "1", params
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """Returns row ids matching every term of query, newest first"""
+        terms = query.lower().split()
+        with self.lock:
+            rows = list(itertools.islice(self._iter_memory(terms, limit), limit))
+
+            # In-memory rows are newer than anything spilled
+            if self.spill_conn is not None and (limit is None or len(rows) < limit):
+                tables, key, where, params = self._spilled_query(terms)
+                sql = f"SELECT id FROM {tables} WHERE {where} ORDER BY {key} DESC"
+                if limit is not None:
+                    sql += f" LIMIT {int(limit - len(rows))}"
+                rows.extend(row for (row,) in self.spill_conn.execute(sql, params))
+            return rows
+
+    def count(self, query: str, limit: Optional[int] = None) -> int:
+        """Number of live rows matching query, counting no further than limit
+
+        In-memory rows are counted from the postings and sorted columns, but
+        counting spilled rows means reading them, so a limit keeps the cost
+        bounded.
+        """
+        terms = query.lower().split()
+        with self.lock:
+            total = self._memory_count(terms)
+            if limit is not None and total >= limit:
+                return limit
+            if self.spill_conn is not None:
+                tables, _, where, params = self._spilled_query(terms)
+                sql = f"SELECT 1 FROM {tables} WHERE {where}"
+                if limit is not None:
+                    sql += f" LIMIT {int(limit - total)}"
+                total += self.spill_conn.execute(f"SELECT count(*) FROM ({sql})", params).fetchone()[0]
+            return total
+
+    def iter_search(self, query: str, start: int = 0, page_size: int = 1000):
+        """Yields (row id, file_path, size_mb, mtime, reason) for live rows matching query, in id order
+
+        Spilled matches are read a page at a time by the same filtered query,
+        keyed on the last id seen; in-memory ones follow.
+        """
+        terms = query.lower().split()
+        while start < self.base and self.spill_conn is not None:
+            with self.lock:
+                tables, key, where, params = self._spilled_query(terms)
+                page = self.spill_conn.execute(
+                    f"SELECT id, path, size_mb, mtime, reason FROM {tables} "
+                    f"WHERE {key} >= ? AND {where} ORDER BY {key} LIMIT ?",
+                    [start] + params + [page_size]).fetchall()
+            if not page:
+                break
+            yield from page
+            start = page[-1][0] + 1
+        with self.lock:
+            # Newest first, so stop at the first row before start
+            rows = list(itertools.takewhile(lambda row: row >= start, self._iter_memory(terms)))
+        for row in reversed(rows):
+            record = self.row(row)
+            if record:
+                yield (row,) + tuple(record)
+
+class RecommendationList:
+    """List-like view of live recommendations in scan order, paged in from a ResultIndex
+
+    Items are (file_path, size_mb, last_used, reason) tuples, with last_used
+    as indexed by the scan, so showing them needs no stat call.
+    """
+
+    def __init__(self, index: ResultIndex):
+        self.index = index
+
+    def __len__(self):
+        return self.index.live_count()
+
+    def __getitem__(self, position: int) -> Tuple[str, float, float, str]:
+        return tuple(self.index.nth(position))
+
+    def __iter__(self):
+        for _, file_path, size_mb, last_used, reason in self.index.iter_rows():
+            yield file_path, size_mb, last_used, reason
+
+    def pop(self, position: int) -> Tuple[str, float, float, str]:
+        rec = self[position]
+        self.index.discard(rec[0])
+        return rec
+
+class FileColumns:
+    """Compact per-file metadata for every scanned file, stored column by column
+
+    spill() appends the in-memory columns to raw files in a temporary
+    directory; to_numpy() then memory-maps them so analytics page data in
+    from disk instead of holding it all in RAM.
+    """
+
+    # Category codes, mirroring SizeAgeRule
+    NONE, VERY_LARGE, OLD, LARGE = 0, 1, 2, 3
+
+    columns = [
+        ("sizes", 'q', "int64"),  # bytes
+        ("last_used", 'd', "float64"),  # mtime, or the last tracked open
+        ("atimes", 'd', "float64"),
+        ("ext_ids", 'i', "int32"),
+        ("eligible", 'b', "int8"),  # 0 where a rule rejected the file outright
+    ]
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spill_dir = None
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            for name, typecode, _ in self.columns:
+                setattr(self, name, array.array(typecode))
+            self.ext_names = []
+            self.ext_lookup = {}
+            self.spilled = 0
+            if self.spill_dir:
+                shutil.rmtree(self.spill_dir, ignore_errors=True)
+                self.spill_dir = None
+
+    def spill(self):
+        """Appends the in-memory columns to their files on disk and empties them"""
+        with self.lock:
+            if not len(self.sizes):
+                return
+            if self.spill_dir is None:
+                import tempfile
+                self.spill_dir = tempfile.mkdtemp(prefix="smartdisk_columns_")
+                atexit.register(_remove_temp, self.spill_dir)
+            self.spilled += len(self.sizes)
+            for name, typecode, _ in self.columns:
+                with open(os.path.join(self.spill_dir, name), 'ab') as f:
+                    getattr(self, name).tofile(f)
+                setattr(self, name, array.array(typecode))
+
+    def append(self, file_path: str, file_stat: os.stat_result, last_used: float, eligible: bool):
+        ext = os.path.splitext(file_path)[1].lower()
+        with self.lock:
+            ext_id = self.ext_lookup.get(ext)
+            if ext_id is None:
+                ext_id = self.ext_lookup[ext] = len(self.ext_names)
+                self.ext_names.append(ext)
+            self.sizes.append(file_stat.st_size)
+            self.last_used.append(last_used)
+            self.atimes.append(file_stat.st_atime)
+            self.ext_ids.append(ext_id)
+            self.eligible.append(1 if eligible else 0)
+
+    def __len__(self):
+        return self.spilled + len(self.sizes)
+
+    def to_numpy(self) -> Dict:
+        """Returns the columns as NumPy arrays (numpy is only imported here)
+
+        In-memory columns are copied; once anything has spilled, the rest is
+        spilled too and the files are memory-mapped read-only.
+        """
+        import numpy as np
+        if self.spilled:
+            self.spill()
+        with self.lock:
+            if self.spilled:
+                arrays = {name: np.memmap(os.path.join(self.spill_dir, name), dtype=dtype, mode='r')
+                          for name, _, dtype in self.columns}
+            else:
+                arrays = {name: np.array(getattr(self, name), dtype=dtype)
+                          for name, _, dtype in self.columns}
+            return {
+                "size": arrays["sizes"],
+                "last_used": arrays["last_used"],
+                "atime": arrays["atimes"],
+                "ext_id": arrays["ext_ids"],
+                "eligible": arrays["eligible"].view(np.bool_),
+                "ext_names": list(self.ext_names),
+            }
+
+class ScanAnalytics:
+    """Vectorized summaries over a FileColumns.to_numpy() snapshot
+
+    Columns may be memory-mapped spill files, so every summary walks them
+    in fixed-size chunks and only ever holds one chunk's derived arrays.
+    """
+
+    def __init__(self, columns: Dict, now: Optional[float] = None, chunk_size: int = 1 << 20):
+        import numpy as np
+        self.np = np
+        self.columns = columns
+        self.now = now or time.time()
+        self.chunk_size = chunk_size
+        self.count = len(columns["size"])
+
+    def chunks(self):
+        """Yields (row slice, size in MB, age in days) one chunk at a time"""
+        for start in range(0, self.count, self.chunk_size):
+            part = slice(start, start + self.chunk_size)
+            yield (part, self.columns["size"][part] / (1024 * 1024),
+                   (self.now - self.columns["last_used"][part]) / (24 * 3600))
+
+    def categories(self, very_large_mb: float = 1000, large_mb: float = 100,
+                   max_age_days: float = 180):
+        """Category code per file for the given thresholds"""
+        np = self.np
+        category = np.zeros(self.count, dtype=np.int8)
+        for part, size_mb, age_days in self.chunks():
+            very_large = size_mb >= very_large_mb
+            old = ~very_large & (age_days > max_age_days)
+            large = ~very_large & ~old & (size_mb >= large_mb)
+            codes = category[part]
+            codes[large] = FileColumns.LARGE
+            codes[old] = FileColumns.OLD
+            codes[very_large] = FileColumns.VERY_LARGE
+            codes[~self.columns["eligible"][part]] = FileColumns.NONE
+        return category
+
+    def category_totals(self, category) -> Dict[int, Tuple[int, float]]:
+        """(file count, MB) per category code"""
+        np = self.np
+        counts, sizes = np.zeros(4, dtype=np.int64), np.zeros(4)
+        for part, size_mb, _ in self.chunks():
+            counts += np.bincount(category[part], minlength=4)
+            sizes += np.bincount(category[part], weights=size_mb, minlength=4)
+        return {code: (int(counts[code]), float(sizes[code])) for code in range(4)}
+
+    def size_age_histogram(self, size_edges_mb: List[float], age_edges_days: List[float]):
+        """File counts binned by size (rows) and age (columns)"""
+        np = self.np
+        counts = np.zeros((len(size_edges_mb) - 1, len(age_edges_days) - 1))
+        for _, size_mb, age_days in self.chunks():
+            counts += np.histogram2d(size_mb, age_days, bins=[size_edges_mb, age_edges_days])[0]
+        return counts.astype(int)
+
+    def extension_totals(self, mask=None, limit: int = 15) -> List[Tuple[str, float]]:
+        """Largest extensions by MB, optionally restricted to mask"""
+        np = self.np
+        totals = np.zeros(len(self.columns["ext_names"]))
+        for part, size_mb, _ in self.chunks():
+            ext_ids = self.columns["ext_id"][part]
+            if mask is not None:
+                ext_ids, size_mb = ext_ids[mask[part]], size_mb[mask[part]]
+            totals += np.bincount(ext_ids, weights=size_mb, minlength=len(totals))
+        top = np.argsort(totals)[::-1][:limit]
+        return [(self.columns["ext_names"][i] or "(none)", float(totals[i]))
+                for i in top if totals[i] > 0]
+
+    def savings_curve(self, mask, bins: int = 2048) -> Tuple:
+        """Cumulative (files, MB) reclaimed when acting on candidates largest-first
+
+        Candidate sizes are bucketed into log-spaced bins (1KB to 10TB) instead
+        of sorted, so the curve is exact at every bin edge and needs one pass.
+        """
+        np = self.np
+        edges = np.concatenate([[0.0], np.logspace(-3, 7, bins - 1), [np.inf]])
+        counts, sizes = np.zeros(bins), np.zeros(bins)
+        for part, size_mb, _ in self.chunks():
+            size_mb = size_mb[mask[part]]
+            counts += np.histogram(size_mb, edges)[0]
+            sizes += np.histogram(size_mb, edges, weights=size_mb)[0]
+        used = counts[::-1] > 0
+        return np.cumsum(counts[::-1])[used], np.cumsum(sizes[::-1])[used]
+
+class UsageStore:
+    """On-disk record of when files were really last opened
+
+    Rows are keyed by (directory, file name) so the scanner can fetch a whole
+    directory's usage in one indexed query. Writes are buffered and flushed in
+    batches.
+    """
+
+    def __init__(self, db_path: str = "", batch_size: int = 1000, flush_interval: float = 5.0):
+        self.db_path = db_path or os.path.join(os.path.expanduser("~"), ".smartdisk_usage.db")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = {}  # (directory, name) -> last used
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        self.conn = None
+
+    def connect(self):
+        if self.conn is None:
+            import sqlite3
+            self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS usage ("
+                "dir TEXT NOT NULL, name TEXT NOT NULL, last_used REAL NOT NULL, "
+                "PRIMARY KEY (dir, name)) WITHOUT ROWID"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS own_reads ("
+                "dir TEXT NOT NULL, name TEXT NOT NULL, until REAL NOT NULL, "
+                "PRIMARY KEY (dir, name)) WITHOUT ROWID"
+            )
+        return self.conn
+
+    def ignore_opens(self, file_paths: List[str], seconds: float = 10.0):
+        """Marks upcoming opens of file_paths as the optimizer's own reads
+
+        Trackers sharing this database skip opens of these files for the next
+        seconds, so content checks and archiving don't make files look used.
+        Written immediately, since the open follows right after.
+        """
+        now = time.time()
+        with self.lock:
+            conn = self.connect()
+            with conn:
+                conn.execute("DELETE FROM own_reads WHERE until < ?", (now,))
+                conn.executemany(
+                    "INSERT INTO own_reads (dir, name, until) VALUES (?, ?, ?) "
+                    "ON CONFLICT (dir, name) DO UPDATE SET until = max(until, excluded.until)",
+                    [(*os.path.split(os.path.abspath(path)), now + seconds) for path in file_paths]
+                )
+
+    def is_own_read(self, file_path: str) -> bool:
+        """True if the optimizer announced an open of file_path that is still in its window"""
+        directory, name = os.path.split(file_path)
+        with self.lock:
+            return self.connect().execute(
+                "SELECT 1 FROM own_reads WHERE dir = ? AND name = ? AND until >= ?",
+                (directory, name, time.time())
+            ).fetchone() is not None
+
+    def record(self, file_path: str, timestamp: Optional[float] = None):
+        """Buffers one file open, flushing once the batch is full or old enough"""
+        directory, name = os.path.split(file_path)
+        with self.lock:
+            self.pending[(directory, name)] = timestamp or time.time()
+            due = (len(self.pending) >= self.batch_size or
+                   time.monotonic() - self.last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Writes buffered opens in a single transaction"""
+        with self.lock:
+            batch, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+            if not batch:
+                return
+            conn = self.connect()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO usage (dir, name, last_used) VALUES (?, ?, ?) "
+                    "ON CONFLICT (dir, name) DO UPDATE SET "
+                    "last_used = max(last_used, excluded.last_used)",
+                    [(directory, name, ts) for (directory, name), ts in batch.items()]
+                )
+
+    def last_used_in(self, directory: str) -> Dict[str, float]:
+        """Last real use of every tracked file directly inside directory"""
+        with self.lock:
+            rows = self.connect().execute(
+                "SELECT name, last_used FROM usage WHERE dir = ?", (directory,)
+            ).fetchall()
+        return dict(rows)
+
+class UsageTracker:
+    """Feeds real file opens into a UsageStore from kernel access events (Linux only)
+
+    fanotify watches whole mounts in one mark but needs CAP_SYS_ADMIN; without it
+    the tracker falls back to inotify watches on every directory under the paths,
+    bounded by fs.inotify.max_user_watches. fanotify events from this process
+    are ignored. inotify cannot tell who opened a file, and a standalone tracker
+    cannot tell which pids belong to the optimizer, so in both modes opens
+    announced through UsageStore.ignore_opens are skipped as well.
+    """
+
+    FAN_CLASS_NOTIF = 0x0
+    FAN_CLOEXEC = 0x1
+    FAN_MARK_ADD = 0x1
+    FAN_MARK_MOUNT = 0x10
+    FAN_OPEN = 0x20
+    AT_FDCWD = -100
+
+    IN_CLOEXEC = 0o2000000
+    IN_OPEN = 0x20
+    IN_CREATE = 0x100
+    IN_ISDIR = 0x40000000
+
+    def __init__(self, store: UsageStore, paths: List[str]):
+        self.store = store
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.stop_event = threading.Event()
+        self.mode = None
+
+    def start(self):
+        """Starts tracking on a daemon thread"""
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        """Tracks opens until stopped, preferring fanotify"""
+        if not sys.platform.startswith("linux"):
+            raise OSError("Usage tracking needs fanotify or inotify (Linux only)")
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        try:
+            fd = self.open_fanotify(libc)
+            self.mode = "fanotify"
+            self.read_events(fd, self.handle_fanotify)
+        except OSError:
+            watches = {}
+            fd = self.open_inotify(libc, watches)
+            self.mode = "inotify"
+            self.read_events(fd, lambda data: self.handle_inotify(libc, fd, watches, data))
+
+    def open_fanotify(self, libc) -> int:
+        import ctypes
+        fd = libc.fanotify_init(self.FAN_CLASS_NOTIF | self.FAN_CLOEXEC,
+                                os.O_RDONLY | getattr(os, 'O_LARGEFILE', 0))
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "fanotify_init failed")
+        libc.fanotify_mark.argtypes = [ctypes.c_int, ctypes.c_uint, ctypes.c_uint64,
+                                       ctypes.c_int, ctypes.c_char_p]
+        for path in self.paths:
+            if libc.fanotify_mark(fd, self.FAN_MARK_ADD | self.FAN_MARK_MOUNT, self.FAN_OPEN,
+                                  self.AT_FDCWD, os.fsencode(path)) < 0:
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), f"fanotify_mark failed for {path}")
+        return fd
+
+    def open_inotify(self, libc, watches: Dict[int, str]) -> int:
+        import ctypes
+        fd = libc.inotify_init1(self.IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        for path in self.paths:
+            for root, _, _ in os.walk(path):
+                if not self.add_inotify_watch(libc, fd, watches, root):
+                    return fd
+        return fd
+
+    def add_inotify_watch(self, libc, fd: int, watches: Dict[int, str], directory: str) -> bool:
+        """Watches one directory; False once the kernel watch limit is reached"""
+        wd = libc.inotify_add_watch(fd, os.fsencode(directory), self.IN_OPEN | self.IN_CREATE)
+        if wd >= 0:
+            watches[wd] = directory
+            return True
+        import ctypes, errno
+        return ctypes.get_errno() != errno.ENOSPC
+
+    def read_events(self, fd: int, handler):
+        """Reads event buffers, flushing the store whenever things go quiet"""
+        import select
+        try:
+            while not self.stop_event.is_set():
+                ready, _, _ = select.select([fd], [], [], self.store.flush_interval)
+                if ready:
+                    handler(os.read(fd, 64 * 1024))
+                else:
+                    self.store.flush()
+        finally:
+            os.close(fd)
+            self.store.flush()
+
+    def handle_fanotify(self, data: bytes):
+        own_pid = os.getpid()
+        offset = 0
+        while offset + 24 <= len(data):
+            event_len, _, _, _, _, event_fd, pid = struct.unpack_from('<IBBHQii', data, offset)
+            if event_fd >= 0:
+                try:
+                    if pid != own_pid:
+                        path = os.readlink(f"/proc/self/fd/{event_fd}")
+                        if not path.endswith(" (deleted)"):
+                            self.record(path)
+                except OSError:
+                    pass
+                finally:
+                    os.close(event_fd)
+            offset += event_len or 24
+
+    def handle_inotify(self, libc, fd: int, watches: Dict[int, str], data: bytes):
+        offset = 0
+        while offset + 16 <= len(data):
+            wd, mask, _, name_len = struct.unpack_from('iIII', data, offset)
+            name = os.fsdecode(data[offset + 16:offset + 16 + name_len].rstrip(b"\0"))
+            offset += 16 + name_len
+            directory = watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & self.IN_ISDIR:
+                if mask & self.IN_CREATE:
+                    self.add_inotify_watch(libc, fd, watches, path)
+            elif mask & self.IN_OPEN:
+                self.record(path)
+
+    def record(self, path: str):
+        """Records an open unless the optimizer announced it as its own read"""
+        if not self.store.is_own_read(path):
+            self.store.record(path)
+
+class MemoryBudget:
+    """Decides when a scan should spill its results to disk
+
+    Uses the process RSS from psutil; without psutil, falls back to a cap on
+    the number of in-memory file rows.
+    """
+
+    def __init__(self, limit_mb: float = 1536, fallback_rows: int = 5_000_000):
+        self.limit_mb = limit_mb
+        self.fallback_rows = fallback_rows
+
+    def exceeded(self, rows_in_memory: int) -> bool:
+        try:
+            import psutil
+            return psutil.Process().memory_info().rss / (1024 * 1024) > self.limit_mb
+        except ImportError:
+            return rows_in_memory > self.fallback_rows
+        except psutil.Error:
+            return False
+
+class RecommendationRule:
+    """Base class for recommendation rules
+
+    Cheap rules only look at metadata and run inline during the walk. Their
+    evaluate() returns a reason to recommend the file, "" to reject it
+    outright, or None to defer to the next rule.
+
+    Expensive rules read file contents. They run on a worker pool, only for
+    files the cheap rules did not decide and whose wants() returns True, and
+    their evaluate() returns a reason or None.
+    """
+    CHEAP = "cheap"
+    EXPENSIVE = "expensive"
+
+    name = "rule"
+    tier = CHEAP
+
+    def wants(self, file_path: str, file_name: str, size_mb: float, age_days: float) -> bool:
+        """Cheap prefilter deciding whether an expensive rule should look at a file"""
+        return True
+
+    def evaluate(self, file_path: str, file_name: str, size_mb: float, age_days: float) -> Optional[str]:
+        return None
+
+class SystemFileRule(RecommendationRule):
+    """Rejects system directories and hidden/system files"""
+    name = "system_files"
+
+    def evaluate(self, file_path, file_name, size_mb, age_days):
+        if any(sys_dir in file_path.lower() for sys_dir in [
+            'windows', 'program files', 'appdata', '$recycle.bin', 'system32'
+        ]):
+            return ""
+        if file_name.startswith(('.', '$')) or file_name in ['desktop.ini', 'thumbs.db']:
+            return ""
+        return None
+
+class SizeAgeRule(RecommendationRule):
+    """Flags very large, old and large files"""
+    name = "size_age"
+
+    def __init__(self, very_large_mb: float = 1000, large_mb: float = 100, max_age_days: float = 180):
+        self.very_large_mb = very_large_mb
+        self.large_mb = large_mb
+        self.max_age_days = max_age_days
+
+    def evaluate(self, file_path, file_name, size_mb, age_days):
+        if size_mb >= self.very_large_mb:  # Files larger than 1GB
+            return f"Very large file ({size_mb:.1f}MB)"
+        elif age_days > self.max_age_days:  # Files not accessed in 6 months
+            return f"Old file, not accessed in {age_days:.0f} days"
+        elif size_mb >= self.large_mb:  # Files larger than 100MB
+            if any(ext in file_name for ext in ['.mp4', '.mov', '.avi', '.mkv']):
+                return f"Large media file ({size_mb:.1f}MB)"
+            return f"Large file ({size_mb:.1f}MB)"
+        return None
+
+class ExtractedArchiveRule(RecommendationRule):
+    """Flags archives, detected by their magic bytes, that sit next to their extracted folder"""
+    name = "extracted_archive"
+    tier = RecommendationRule.EXPENSIVE
+
+    signatures = [
+        (b"PK\x03\x04", ".zip"),
+        (b"\x1f\x8b", ".gz"),
+        (b"7z\xbc\xaf\x27\x1c", ".7z"),
+        (b"Rar!\x1a\x07", ".rar"),
+        (b"\xfd7zXZ\x00", ".xz"),
+        (b"BZh", ".bz2"),
+    ]
+
+    def __init__(self, min_size_mb: float = 10):
+        self.min_size_mb = min_size_mb
+
+    def wants(self, file_path, file_name, size_mb, age_days):
+        return size_mb >= self.min_size_mb
+
+    def evaluate(self, file_path, file_name, size_mb, age_days):
+        with open(file_path, 'rb') as f:
+            header = f.read(8)
+        if not any(header.startswith(magic) for magic, _ in self.signatures):
+            return None
+
+        # "foo.tar.gz" is usually extracted to "foo"
+        stem = file_path
+        while os.path.splitext(stem)[1]:
+            stem = os.path.splitext(stem)[0]
+        if os.path.isdir(stem):
+            return f"Archive already extracted ({size_mb:.1f}MB)"
+        return None
+
+class VerdictCache:
+    """Bounded, least-recently-used record of expensive rule verdicts
+
+    Keyed by (path, size, mtime) so a changed file is checked again. One
+    cache can be shared by many engines, letting rescans skip content
+    checks that an earlier scan already ran.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        from collections import OrderedDict
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> reason, "" when no rule matched
+        self.lock = threading.Lock()
+
+    def get(self, key: Tuple[str, int, float]) -> Optional[str]:
+        with self.lock:
+            reason = self.entries.get(key)
+            if reason is not None:
+                self.entries.move_to_end(key)
+            return reason
+
+    def put(self, key: Tuple[str, int, float], reason: str):
+        with self.lock:
+            self.entries[key] = reason
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+class RulePipeline:
+    """Runs cheap rules inline and expensive rules lazily on a worker pool"""
+
+    # Deferred checks kept in memory before they are appended to a temporary file
+    DEFER_BATCH = 10000
+
+    def __init__(self, max_workers: int = 4, usage_store: Optional[UsageStore] = None,
+                 verdicts: Optional[VerdictCache] = None):
+        self.rules = []
+        self.max_workers = max_workers
+        self.max_pending = max_workers * 64  # checks queued on the pool at once
+        self.usage_store = usage_store  # told about content reads so trackers skip them
+        self.executor = None
+        self.lock = threading.Lock()
+        self.slots = threading.Semaphore(self.max_pending)
+        self.pending = set()  # queued or running futures, removed as they finish
+        self.deferred = []  # checks set aside while the pool was full
+        self.deferred_file = None  # older deferred checks, one JSON list per line
+        self.deferred_reading = False  # wait() has started reading deferred_file
+        self.deferred_count = 0
+        self.handlers = []  # (callback, throttle) pairs the deferred checks refer to
+        self.verdicts = verdicts if verdicts is not None else VerdictCache()
+
+    def register(self, rule: RecommendationRule):
+        """Adds a rule; rules of the same tier run in registration order"""
+        self.rules.append(rule)
+
+    def rules_for(self, tier: str) -> List[RecommendationRule]:
+        return [rule for rule in self.rules if rule.tier == tier]
+
+    def evaluate_cheap(self, file_path: str, size_mb: float, age_days: float) -> Optional[str]:
+        """Runs cheap rules; returns a reason, "" if rejected, or None if undecided"""
+        file_name = os.path.basename(file_path).lower()
+        for rule in self.rules_for(RecommendationRule.CHEAP):
+            verdict = rule.evaluate(file_path, file_name, size_mb, age_days)
+            if verdict is not None:
+                return verdict
+        return None
+
+    def submit_expensive(self, file_path: str, file_stat: os.stat_result, size_mb: float,
+                         age_days: float, callback, throttle=None, args: tuple = ()):
+        """Queues expensive rules for a file the cheap tier left undecided
+
+        callback(*args, reason) runs on a worker thread when a rule matches.
+        With a throttle, each rule waits for it before reading the file. At
+        most max_pending checks are queued on the pool; past that the file is
+        set aside, in a temporary file once there are many, and checked by
+        wait(), so the walk never blocks on the pool. args must be JSON
+        serializable for that.
+        """
+        self._submit(file_path, file_stat.st_size, file_stat.st_mtime, size_mb, age_days,
+                     callback, throttle, args, block=False)
+
+    def _submit(self, file_path: str, st_size: int, st_mtime: float, size_mb: float,
+                age_days: float, callback, throttle, args, block: bool):
+        """Queues a check on the pool, or defers it if the pool is full and block is false"""
+        file_name = os.path.basename(file_path).lower()
+        rules = [rule for rule in self.rules_for(RecommendationRule.EXPENSIVE)
+                 if rule.wants(file_path, file_name, size_mb, age_days)]
+        if not rules:
+            return
+
+        key = (file_path, st_size, st_mtime)
+        cached = self.verdicts.get(key)
+        if cached is not None:
+            if cached:
+                callback(*args, cached)
+            return
+
+        if not self.slots.acquire(blocking=block):
+            self._defer([file_path, st_size, st_mtime, size_mb, age_days, list(args)], (callback, throttle))
+            return
+
+        def run():
+            reason = ""
+            if self.usage_store:
+                try:
+                    self.usage_store.ignore_opens([file_path])
+                except Exception:
+                    pass
+            for rule in rules:
+                if throttle:
+                    throttle.wait()
+                try:
+                    reason = rule.evaluate(file_path, file_name, size_mb, age_days) or ""
+                except (PermissionError, OSError):
+                    continue
+                if reason:
+                    break
+            self.verdicts.put(key, reason)
+            if reason:
+                callback(*args, reason)
+
+        if self.executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        future = self.executor.submit(run)
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self._finished)
+
+    def _finished(self, future):
+        """Frees the pool slot of a finished or cancelled check"""
+        with self.lock:
+            self.pending.discard(future)
+        self.slots.release()
+
+    def _defer(self, entry: list, handler: tuple):
+        """Sets a check aside, appending the in-memory batch to a temporary file when it fills up"""
+        with self.lock:
+            for index, known in enumerate(self.handlers):
+                if known[0] is handler[0] and known[1] is handler[1]:
+                    break
+            else:
+                index = len(self.handlers)
+                self.handlers.append(handler)
+            self.deferred.append(entry + [index])
+            self.deferred_count += 1
+            if len(self.deferred) >= self.DEFER_BATCH:
+                if self.deferred_file is None:
+                    import tempfile
+                    self.deferred_file = tempfile.TemporaryFile('w+', encoding='utf-8')
+                self.deferred_file.writelines(json.dumps(item) + "\n" for item in self.deferred)
+                self.deferred = []
+
+    def _next_deferred(self):
+        """Returns the next deferred check as (entry, handler), or None once none are left"""
+        with self.lock:
+            item = None
+            if self.deferred_file is not None:
+                if not self.deferred_reading:
+                    # The walk is over; read the file back from the start
+                    self.deferred_file.seek(0)
+                    self.deferred_reading = True
+                line = self.deferred_file.readline()
+                if line:
+                    item = json.loads(line)
+                else:
+                    self.deferred_file.close()
+                    self.deferred_file, self.deferred_reading = None, False
+            if item is None and self.deferred:
+                item = self.deferred.pop()
+            if item is None:
+                self.handlers = []
+                return None
+            self.deferred_count -= 1
+            return item[:-1], self.handlers[item[-1]]
+
+    def outstanding(self) -> int:
+        """Number of expensive checks queued, running or deferred"""
+        with self.lock:
+            return len(self.pending) + self.deferred_count
+
+    def wait(self):
+        """Runs the checks deferred during the walk, then blocks until every check has finished"""
+        from concurrent.futures import wait
+        while True:
+            item = self._next_deferred()
+            if item is None:
+                break
+            (file_path, st_size, st_mtime, size_mb, age_days, args), (callback, throttle) = item
+            self._submit(file_path, st_size, st_mtime, size_mb, age_days,
+                         callback, throttle, args, block=True)
+        with self.lock:
+            pending = list(self.pending)
+        wait(pending)
+
+    def cancel_pending(self):
+        """Drops expensive checks that have not started yet, deferred ones included"""
+        with self.lock:
+            pending = list(self.pending)
+            self.deferred = []
+            self.deferred_count = 0
+            if self.deferred_file is not None:
+                self.deferred_file.close()
+                self.deferred_file, self.deferred_reading = None, False
+        for future in pending:
+            future.cancel()
+
+class TokenBucket:
+    """Blocking token bucket limiting operations per second"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("token bucket rate must be positive")
+        self.rate = rate
+        self.burst = burst or rate
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def set_rate(self, rate: float):
+        """Changes the rate, scaling the burst with it so a slowdown takes effect at once"""
+        with self.lock:
+            self.burst *= rate / self.rate
+            self.tokens = min(self.tokens, self.burst)
+            self.rate = rate
+
+    def acquire(self, tokens: float = 1):
+        """Waits until tokens are available, then takes them"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                shortfall = (tokens - self.tokens) / self.rate
+            time.sleep(shortfall)
+
+class ScanThrottle:
+    """Keeps a scan from competing with production I/O
+
+    Every stat and readdir call takes a token from a bucket. The scanning
+    thread drops to idle I/O and lowest CPU priority, and the rate is halved
+    while system iowait or load per core is above its threshold, then
+    recovers once the host is quiet again.
+    """
+
+    def __init__(self, ops_per_second: float = 500, max_iowait_percent: float = 20,
+                 max_load_per_cpu: float = 1.5, check_interval: float = 1.0):
+        self.max_rate = ops_per_second
+        self.min_rate = min(ops_per_second, max(1, ops_per_second / 32))
+        self.bucket = TokenBucket(ops_per_second)
+        self.max_iowait_percent = max_iowait_percent
+        self.max_load_per_cpu = max_load_per_cpu
+        self.check_interval = check_interval
+        self.last_check = 0.0
+
+    def lower_priority(self):
+        """Drops the calling thread (or the process, where threads can't be targeted) to background priority"""
+        try:
+            import psutil
+        except ImportError:
+            if hasattr(os, 'nice'):
+                os.nice(19)
+            return
+        try:
+            if sys.platform.startswith("linux"):
+                # Linux schedules threads as tasks, so only the scanning thread is affected
+                task = psutil.Process(threading.get_native_id())
+                task.nice(19)
+                task.ionice(psutil.IOPRIO_CLASS_IDLE)
+            elif sys.platform == "win32":
+                process = psutil.Process()
+                process.nice(psutil.IDLE_PRIORITY_CLASS)
+                process.ionice(psutil.IOPRIO_VERYLOW)
+            else:
+                psutil.Process().nice(19)
+        except (psutil.Error, OSError, AttributeError):
+            pass
+
+    def host_is_busy(self) -> bool:
+        """True when system iowait or load per core is above its threshold"""
+        try:
+            import psutil
+            iowait = getattr(psutil.cpu_times_percent(interval=None), 'iowait', 0)
+            if iowait > self.max_iowait_percent:
+                return True
+            load = psutil.getloadavg()[0]
+        except ImportError:
+            if not hasattr(os, 'getloadavg'):
+                return False
+            load = os.getloadavg()[0]
+        except (OSError, AttributeError):
+            return False
+        return load / (os.cpu_count() or 1) > self.max_load_per_cpu
+
+    def adapt(self):
+        """Halves the rate while the host is busy and doubles it back once quiet"""
+        now = time.monotonic()
+        if now - self.last_check < self.check_interval:
+            return
+        self.last_check = now
+        if self.host_is_busy():
+            self.bucket.set_rate(max(self.min_rate, self.bucket.rate / 2))
+        else:
+            self.bucket.set_rate(min(self.max_rate, self.bucket.rate * 2))
+
+    def wait(self):
+        """Called before every stat/readdir"""
+        self.adapt()
+        self.bucket.acquire()
+
+class ScanEngine:
+    """Walks a drive and collects recommendations; shared by the GUI and agent mode"""
+
+    def __init__(self, usage_store: Optional[UsageStore] = None,
+                 memory_budget: Optional[MemoryBudget] = None,
+                 verdicts: Optional[VerdictCache] = None):
+        self.rule_pipeline = RulePipeline(usage_store=usage_store, verdicts=verdicts)
+        self.size_rule = SizeAgeRule()  # its thresholds also decide the recommendation banks
+        self.rule_pipeline.register(SystemFileRule())
+        self.rule_pipeline.register(self.size_rule)
+        self.rule_pipeline.register(ExtractedArchiveRule())
+        self.result_index = ResultIndex()
+        self.file_columns = FileColumns()
+        self.usage_store = usage_store  # optional, overrides mtime-based staleness
+        self.memory_budget = memory_budget or MemoryBudget()
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, path: str = "", state: str = "idle"):
+        """Forgets previous results"""
+        self.path = path
+        self.state = state  # idle, running, complete, cancelled
+        self.files_scanned = 0
+        self.total_size = 0.0  # MB
+        self.started_at = None
+        self.finished_at = None
+        self.result_index.clear()
+        self.file_columns.clear()
+        self.cancel_event.clear()
+
+    def cancel(self):
+        """Asks a running scan to stop"""
+        self.cancel_event.set()
+        self.rule_pipeline.cancel_pending()
+
+    def get_recommendation_category(self, file_path: str, size_mb: float, age_days: float) -> str:
+        """Picks the recommendation bank a file belongs in, using the active SizeAgeRule thresholds"""
+        if age_days > self.size_rule.max_age_days:
+            return "unused_files"
+        elif size_mb >= self.size_rule.very_large_mb:
+            return "large_files"
+        elif 'download' in file_path.lower() or file_path.endswith(('.tmp', '.temp')):
+            return "old_files"
+        return ""
+
+    def scan(self, path: str, on_recommendation=None, on_status=None,
+             throttle: Optional[ScanThrottle] = None):
+        """Scans path, calling on_recommendation(file_path, size_mb, last_used, reason) for each hit
+
+        With a throttle, every readdir and stat waits for the throttle first.
+        """
+        self.reset(path, "running")
+        self.started_at = time.time()
+        if throttle:
+            throttle.lower_priority()
+
+        def add_recommendation(file_path, size_mb, mtime, reason):
+            with self.lock:
+                self.result_index.add(file_path, size_mb, mtime, reason)
+                self.total_size += size_mb
+            if on_recommendation:
+                on_recommendation(file_path, size_mb, mtime, reason)
+
+        for root, _, files in os.walk(path):
+            if self.cancel_event.is_set():
+                break
+            if throttle:
+                # os.walk lists one directory per iteration
+                throttle.wait()
+            
+            # Real opens recorded by the usage tracker, fetched once per directory
+            tracked = {}
+            if self.usage_store:
+                try:
+                    tracked = self.usage_store.last_used_in(os.path.abspath(root))
+                except Exception:
+                    tracked = {}
+            
+            for file in files:
+                try:
+                    file_path = os.path.join(root, file)
+                    self.files_scanned += 1
+                    
+                    # Keep results within the memory budget by moving them to disk
+                    if self.files_scanned % 10000 == 0:
+                        if self.memory_budget.exceeded(len(self.file_columns.sizes)):
+                            self.result_index.spill()
+                            self.file_columns.spill()
+                        else:
+                            # Sort new rows as they arrive so size/age searches stay cheap
+                            self.result_index.presort()
+                    
+                    # Get file info
+                    if throttle:
+                        throttle.wait()
+                    file_stat = os.stat(file_path)
+                    size_mb = file_stat.st_size / (1024 * 1024)
+                    # atime is unreliable on noatime/relatime mounts, so staleness is the
+                    # later of the last modification and the last tracked open
+                    last_used = max(file_stat.st_mtime, tracked.get(file, 0))
+                    age_days = (time.time() - last_used) / (24 * 3600)
+                    
+                    # Check if file should be recommended
+                    reason = self.rule_pipeline.evaluate_cheap(file_path, size_mb, age_days)
+                    self.file_columns.append(file_path, file_stat, last_used, reason != "")
+                    if reason:
+                        add_recommendation(file_path, size_mb, last_used, reason)
+                    elif reason is None:
+                        # Content checks run off the walk thread
+                        self.rule_pipeline.submit_expensive(
+                            file_path, file_stat, size_mb, age_days, add_recommendation,
+                            throttle, args=(file_path, size_mb, last_used)
+                        )
+                
+                except (PermissionError, OSError):
+                    continue
+
+        # Wait for outstanding content checks
+        outstanding = self.rule_pipeline.outstanding()
+        if outstanding and on_status:
+            on_status(f"Finishing {outstanding:,} content checks...")
+        self.rule_pipeline.wait()
+
+        self.state = "cancelled" if self.cancel_event.is_set() else "complete"
+        self.finished_at = time.time()
+
+    def aggregates(self) -> Dict:
+        """Totals per recommendation bank and per extension"""
+        categories = {}
+        extensions = {}
+        now = time.time()
+        # Streams through the index so spilled results are paged in, not loaded at once
+        for _, file_path, size_mb, mtime, _ in self.result_index.iter_rows():
+            category = self.get_recommendation_category(
+                file_path, size_mb, (now - mtime) / (24 * 3600)) or "other"
+            ext = os.path.splitext(file_path.lower())[1] or "(none)"
+            for totals, key in ((categories, category), (extensions, ext)):
+                bucket = totals.setdefault(key, {"files": 0, "size_mb": 0.0})
+                bucket["files"] += 1
+                bucket["size_mb"] += size_mb
+        return {
+            "path": self.path,
+            "state": self.state,
+            "files_scanned": self.files_scanned,
+            "recommendations": self.result_index.live_count(),
+            "total_size_mb": self.total_size,
+            "categories": categories,
+            "extensions": extensions,
+        }
+
+class ScanAgent:
+    """Long-lived scan service exposing ScanEngine over HTTP/JSON
+
+    Endpoints (path selects the scanned root, default "/"):
+        POST /scan?path=...[&rescan=1]   start a scan, reusing cached results unless rescan
+        POST /cancel?path=...            cancel a running scan
+        GET  /status?path=...            scan progress
+        GET  /recommendations?path=...[&q=...][&offset=N][&follow=1]
+                                         stream recommendations as chunked JSON lines
+        GET  /aggregates?path=...        per-bank and per-extension totals
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, token: str = "",
+                 usage_store: Optional[UsageStore] = None,
+                 memory_budget: Optional[MemoryBudget] = None):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.usage_store = usage_store
+        self.memory_budget = memory_budget
+        self.verdicts = VerdictCache()  # shared by every engine, so rescans reuse content checks
+        self.heartbeat_interval = 10.0  # seconds between keep-alive lines on idle streams
+        self.engines = {}  # scanned root -> ScanEngine holding its cached results
+        self.lock = threading.Lock()
+
+    def schedule(self, paths: List[str], interval_hours: float, throttle: ScanThrottle):
+        """Rescans paths every interval_hours in the background under throttle
+
+        Each rescan fills a fresh engine that replaces the cached one only once
+        it completes, so queries keep seeing the last full result meanwhile.
+        Whichever engine loses out is reset, which also deletes its spill files.
+        """
+        def loop():
+            while True:
+                for path in paths:
+                    engine = ScanEngine(self.usage_store, self.memory_budget, self.verdicts)
+                    engine.scan(path, throttle=throttle)
+                    superseded = engine
+                    if engine.state == "complete":
+                        with self.lock:
+                            current = self.engines.get(path)
+                            if current is None or current.state != "running":
+                                self.engines[path] = engine
+                                superseded = current
+                    if superseded is not None:
+                        superseded.reset()
+                time.sleep(interval_hours * 3600)
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def engine_for(self, path: str) -> ScanEngine:
+        with self.lock:
+            if path not in self.engines:
+                self.engines[path] = ScanEngine(self.usage_store, self.memory_budget, self.verdicts)
+            return self.engines[path]
+
+    def start_scan(self, path: str, rescan: bool = False) -> Dict:
+        """Starts a scan unless one is running or cached results exist"""
+        engine = self.engine_for(path)
+        with self.lock:
+            if engine.state == "running" or (engine.state == "complete" and not rescan):
+                return self.status(engine)
+            engine.state = "running"
+        threading.Thread(target=engine.scan, args=(path,), daemon=True).start()
+        return self.status(engine)
+
+    @staticmethod
+    def status(engine: ScanEngine) -> Dict:
+        return {
+            "path": engine.path,
+            "state": engine.state,
+            "files_scanned": engine.files_scanned,
+            "recommendations": engine.result_index.live_count(),
+            "total_size_mb": engine.total_size,
+            "started_at": engine.started_at,
+            "finished_at": engine.finished_at,
+        }
+
+    @staticmethod
+    def iter_recommendations(engine: ScanEngine, query: str = "", offset: int = 0,
+                             follow: bool = False, batch_size: int = 500):
+        """Yields batches of recommendation dicts; with follow, keeps going until the scan ends
+
+        Each poll resumes after the last row sent, with or without a query.
+        While following, an empty batch is yielded on every idle poll so the
+        caller can keep the connection alive.
+        """
+        index = engine.result_index
+        fields = ("row", "path", "size_mb", "mtime", "reason")
+        while True:
+            running = engine.state == "running"
+            batch = []
+            records = index.iter_search(query, offset) if query else index.iter_rows(offset)
+            for record in records:
+                batch.append(dict(zip(fields, record)))
+                offset = record[0] + 1
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+            if not follow or not running:
+                return
+            if not batch:
+                yield []
+            time.sleep(0.5)
+
+    def make_handler(self):
+        from http.server import BaseHTTPRequestHandler
+        from urllib.parse import urlsplit, parse_qs
+        agent = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def handle_request(self, method):
+                if agent.token and not hmac.compare_digest(
+                        self.headers.get("Authorization", "").encode(), f"Bearer {agent.token}".encode()):
+                    return self.send_json({"error": "unauthorized"}, 401)
+
+                url = urlsplit(self.path)
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                path = params.get("path", "/")
+
+                if method == "POST" and url.path == "/scan":
+                    return self.send_json(agent.start_scan(path, params.get("rescan") == "1"))
+                if method == "POST" and url.path == "/cancel":
+                    agent.engine_for(path).cancel()
+                    return self.send_json(agent.status(agent.engine_for(path)))
+                if method == "GET" and url.path == "/status":
+                    return self.send_json(agent.status(agent.engine_for(path)))
+                if method == "GET" and url.path == "/aggregates":
+                    return self.send_json(agent.engine_for(path).aggregates())
+                if method == "GET" and url.path == "/recommendations":
+                    return self.stream_recommendations(agent.engine_for(path), params)
+                return self.send_json({"error": "not found"}, 404)
+
+            def stream_recommendations(self, engine, params):
+                # Validate everything before committing to a 200 response
+                query = params.get("q", "")
+                try:
+                    offset = int(params.get("offset", 0))
+                    if offset < 0:
+                        raise ValueError("offset must not be negative")
+                    engine.result_index.validate(query)
+                except ValueError as e:
+                    return self.send_json({"error": f"bad request: {e}"}, 400)
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    last_write = time.monotonic()
+                    for batch in agent.iter_recommendations(
+                        engine, query, offset, params.get("follow") == "1"
+                    ):
+                        if batch:
+                            chunk = "".join(json.dumps(rec) + "\n" for rec in batch).encode()
+                        elif time.monotonic() - last_write >= agent.heartbeat_interval:
+                            # Blank line keeps idle follow streams under the client's read timeout
+                            chunk = b"\n"
+                        else:
+                            continue
+                        self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                        last_write = time.monotonic()
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def do_GET(self):
+                self.handle_request("GET")
+
+            def do_POST(self):
+                self.handle_request("POST")
+
+        return Handler
+
+    def is_loopback(self) -> bool:
+        """True when the agent only listens on this machine"""
+        import ipaddress
+        if self.host == "localhost":
+            return True
+        try:
+            return ipaddress.ip_address(self.host).is_loopback
+        except ValueError:
+            return False
+
+    def serve_forever(self):
+        """Runs the agent until interrupted"""
+        from http.server import ThreadingHTTPServer
+        server = ThreadingHTTPServer((self.host, self.port), self.make_handler())
+        print(f"SmartDisk agent listening on http://{self.host}:{self.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+class AgentClient:
+    """Talks to a ScanAgent over a small pool of keep-alive connections"""
+
+    def __init__(self, address: str, token: str = "", pool_size: int = 4):
+        host, _, port = address.partition(":")
+        self.address = address
+        self.host = host
+        self.port = int(port or 8765)
+        self.token = token
+        self.pool_size = pool_size
+        self.pool = []
+        self.lock = threading.Lock()
+
+    def _acquire(self):
+        import http.client
+        with self.lock:
+            if self.pool:
+                return self.pool.pop()
+        return http.client.HTTPConnection(self.host, self.port, timeout=30)
+
+    def _release(self, conn):
+        with self.lock:
+            if len(self.pool) < self.pool_size:
+                self.pool.append(conn)
+                return
+        conn.close()
+
+    def _open(self, method: str, url: str):
+        import http.client
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        conn = self._acquire()
+        try:
+            conn.request(method, url, headers=headers)
+            response = conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            # Stale pooled connection, retry once on a fresh one
+            conn.close()
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            conn.request(method, url, headers=headers)
+            response = conn.getresponse()
+        return conn, response
+
+    def call(self, method: str, endpoint: str, **params) -> Dict:
+        """Calls a JSON endpoint"""
+        from urllib.parse import urlencode
+        conn, response = self._open(method, f"{endpoint}?{urlencode(params)}")
+        try:
+            payload = json.loads(response.read())
+        finally:
+            self._release(conn)
+        if response.status != 200:
+            raise OSError(f"{self.address}: {payload.get('error', response.status)}")
+        return payload
+
+    def stream_recommendations(self, **params):
+        """Yields recommendation dicts as the agent streams them"""
+        from urllib.parse import urlencode
+        conn, response = self._open("GET", f"/recommendations?{urlencode(params)}")
+        try:
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            self._release(conn)
 
 class SmartStorageOptimizer:
     def __init__(self):
@@ -30,13 +2064,33 @@ class SmartStorageOptimizer:
         self.root.configure(bg=self.bg_color)
         
         # Initialize variables
-        self.recommendations = []
         self.current_batch_index = 0
         self.batch_size = 5
         self.workstation_active = False
         self.overlay = None
         self.recommendation_windows = []
         
+        # Scan engine; its search index is filled in during the scan
+        usage_store = UsageStore()
+        self.scan_engine = ScanEngine(usage_store if os.path.exists(usage_store.db_path) else None)
+        self.result_index = self.scan_engine.result_index
+        self.rule_pipeline = self.scan_engine.rule_pipeline
+        self.recommendations = RecommendationList(self.result_index)
+        
+        # Results streamed from agents are kept apart from local files
+        self.remote_index = ResultIndex()
+        self.showing_remote = False
+        self.sort_descending = {}
+        self.search_job = None
+        self.search_running = False  # a search thread is busy
+        self.search_stale = False  # the search box changed while it ran
+        self.max_filter_rows = 2000
+        self.max_count_rows = 100000  # match counts stop here, past it they read "100,000+"
+        
+        # Archive action settings
+        self.archive_format = tk.StringVar(value="tar.xz")
+        self.archive_workers = max(1, (os.cpu_count() or 2) - 1)
+        
         # File patterns for smart detection
         self.pattern_rules = {
             "temp_files": r".*\.(tmp|temp)$",
@@ -68,9 +2122,9 @@ class SmartStorageOptimizer:
         drive_frame = tk.Frame(self.main_frame, bg=self.bg_color)
         drive_frame.pack(fill='x', pady=10)
         
-        # Drive selection
-        drives = self.get_drives()
-        self.drive_var = tk.StringVar(value=drives[0] if drives else "")
+        # Drive selection, filled in by discover_drives once the window is up
+        self.drive_var = tk.StringVar(value="")
+        self.drive_labels = {}
         
         tk.Label(
             drive_frame,
@@ -80,14 +2134,15 @@ class SmartStorageOptimizer:
             font=('Arial', 12, 'bold')
         ).pack(side='left', padx=5)
         
-        drive_menu = tk.OptionMenu(drive_frame, self.drive_var, *drives)
-        drive_menu.config(
+        self.drive_menu = tk.OptionMenu(drive_frame, self.drive_var, "")
+        self.drive_menu.config(
             bg=self.button_bg,
             fg=self.fg_color,
             activebackground=self.highlight_color,
             activeforeground=self.fg_color
         )
-        drive_menu.pack(side='left', padx=5)
+        self.drive_menu['menu'].delete(0, 'end')
+        self.drive_menu.pack(side='left', padx=5)
         
         # Scan button
         self.scan_button = tk.Button(
@@ -102,6 +2157,45 @@ class SmartStorageOptimizer:
             pady=5
         )
         self.scan_button.pack(side='left', padx=20)
+        
+        # Drive details (capacity, free space, filesystem)
+        self.drive_info_label = tk.Label(
+            drive_frame,
+            text="Detecting drives...",
+            bg=self.bg_color,
+            fg="#90EE90",
+            font=('Arial', 10)
+        )
+        self.drive_info_label.pack(side='left', padx=5)
+        self.drive_var.trace_add('write', lambda *_: self.drive_info_label.config(
+            text=self.drive_labels.get(self.drive_var.get(), "")
+        ))
+        
+        # Remote agents to scan instead of this machine
+        tk.Label(
+            drive_frame,
+            text="Agents:",
+            bg=self.bg_color,
+            fg=self.fg_color,
+            font=('Arial', 11, 'bold')
+        ).pack(side='left', padx=(20, 5))
+        
+        self.agents_var = tk.StringVar()
+        tk.Entry(
+            drive_frame,
+            textvariable=self.agents_var,
+            bg=self.accent_color,
+            fg=self.fg_color,
+            insertbackground=self.fg_color,
+            font=('Arial', 10),
+            width=30,
+            relief='solid',
+            borderwidth=1
+        ).pack(side='left', padx=5)
+        self.agent_clients = {}
+        
+        # Discover drives without holding up the window
+        threading.Thread(target=self.discover_drives, daemon=True).start()
 
     def create_status_frame(self):
         """Enhanced status frame with dual-panel display"""
@@ -121,6 +2215,9 @@ class SmartStorageOptimizer:
         )
         self.status_label.pack(fill='x', pady=5)
         
+        # Filter-as-you-type search box
+        self.create_search_bar()
+        
         # Create split panel frame
         panel_frame = tk.Frame(self.status_frame, bg=self.bg_color)
         panel_frame.pack(fill='both', expand=True, pady=5)
@@ -131,6 +2228,204 @@ class SmartStorageOptimizer:
         # Right panel: Itemized List
         self.create_itemized_list(panel_frame)
 
+    def create_search_bar(self):
+        """Creates the search box that filters scan results as you type"""
+        search_frame = tk.Frame(self.status_frame, bg=self.bg_color)
+        search_frame.pack(fill='x', pady=5)
+        
+        tk.Label(
+            search_frame,
+            text="Filter:",
+            bg=self.bg_color,
+            fg=self.fg_color,
+            font=('Arial', 11, 'bold')
+        ).pack(side='left', padx=5)
+        
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(
+            search_frame,
+            textvariable=self.search_var,
+            bg=self.accent_color,
+            fg=self.fg_color,
+            insertbackground=self.fg_color,
+            font=('Arial', 11),
+            relief='solid',
+            borderwidth=1
+        )
+        search_entry.pack(side='left', fill='x', expand=True, padx=5)
+        search_entry.bind("<KeyRelease>", self.on_search_changed)
+        
+        tk.Label(
+            search_frame,
+            text="e.g. .iso  backup  size>100mb  age>365",
+            bg=self.bg_color,
+            fg="#90EE90",
+            font=('Arial', 9)
+        ).pack(side='left', padx=5)
+    
+    def on_search_changed(self, event=None):
+        """Debounces keystrokes so the filter runs once typing pauses"""
+        if self.search_job:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(150, self.apply_search_filter)
+    
+    def apply_search_filter(self):
+        """Repopulates the tree and category listboxes with rows matching the search box
+
+        The query runs on a worker thread so typing never waits for it; if the
+        box changes meanwhile, the result is dropped and the search reruns.
+        """
+        self.search_job = None
+        if self.search_running:
+            self.search_stale = True
+            return
+        query = self.search_var.get().strip()
+        index = self.displayed_index()
+        limit, count_limit = self.max_filter_rows, self.max_count_rows
+        
+        def run():
+            try:
+                records = [record for record in map(index.row, index.search(query, limit=limit)) if record]
+                # Terms under 3 characters can't use the trigram postings, so
+                # counting them means scanning every row; skip the total
+                if query and min(map(len, query.split())) >= 3:
+                    total = index.count(query, limit=count_limit)
+                else:
+                    total = None
+            except Exception:
+                # Malformed term, or rows moved to disk mid-search; keep the current view
+                records, total = None, None
+            self.root.after(0, lambda: self.show_search_results(index, query, records, total))
+        
+        self.search_running = True
+        threading.Thread(target=run, daemon=True).start()
+
+    def show_search_results(self, index: ResultIndex, query: str,
+                            records: Optional[list], total: Optional[int]):
+        """Shows the rows found by apply_search_filter, unless the search box changed meanwhile"""
+        self.search_running = False
+        if (self.search_stale or query != self.search_var.get().strip()
+                or index is not self.displayed_index()):
+            self.search_stale = False
+            self.apply_search_filter()
+            return
+        if records is None:
+            return
+        
+        self.clear_result_views()
+        for record in records:
+            self.insert_result_row(*record)
+        
+        if query:
+            if total is None:
+                shown = f"{len(records):,}"
+            else:
+                shown = f"{len(records):,} of {total:,}{'+' if total >= self.max_count_rows else ''}"
+            self.status_label.config(text=f"Showing {shown} matches for '{query}'")
+
+    def displayed_index(self) -> ResultIndex:
+        """The index behind the tree: agent results after an agent scan, local ones otherwise"""
+        return self.remote_index if self.showing_remote else self.result_index
+
+    def local_actions_allowed(self) -> bool:
+        """File actions only work on local files, not on results shown from agents"""
+        if self.showing_remote:
+            messagebox.showinfo(
+                "Agent Results",
+                "File actions are only available for local scans. Run the action on the agent's host."
+            )
+            return False
+        return True
+
+    def clear_result_views(self):
+        """Empties the tree and the category listboxes"""
+        self.file_tree.delete(*self.file_tree.get_children())
+        for cat_id in ("unused_files", "large_files", "old_files"):
+            getattr(self, f'{cat_id}_listbox').delete(0, 'end')
+
+    def sort_results(self, col_id: str):
+        """Shows the largest (size) or least recently used (age) results, toggling on repeat clicks"""
+        import itertools
+        
+        column = "size_mb" if col_id == "size" else "mtime"
+        # First click puts the largest files / oldest last use on top
+        biggest_first = not self.sort_descending.get(col_id, False)
+        self.sort_descending[col_id] = biggest_first
+        descending = biggest_first if column == "size_mb" else not biggest_first
+        
+        index = self.displayed_index()
+        self.search_var.set("")
+        self.clear_result_views()
+        for _, file_path, size_mb, mtime, reason in itertools.islice(
+            index.iter_sorted(column, descending), self.max_filter_rows
+        ):
+            self.insert_result_row(file_path, size_mb, mtime, reason)
+        
+        self.status_label.config(
+            text=f"Showing top {min(self.max_filter_rows, index.live_count()):,} of "
+                 f"{index.live_count():,} results sorted by {'size' if column == 'size_mb' else 'age'}"
+        )
+
+    def export_results(self):
+        """Writes every result matching the search filter to a CSV file in the background"""
+        from tkinter import filedialog
+        file_name = filedialog.asksaveasfilename(
+            title="Export Results",
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv")]
+        )
+        if not file_name:
+            return
+        query = self.search_var.get().strip()
+        index = self.displayed_index()
+        
+        def run():
+            import csv
+            # Pages spilled results in from disk rather than loading them all
+            records = index.iter_search(query) if query else index.iter_rows()
+            
+            written = 0
+            try:
+                with open(file_name, 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(["path", "size_mb", "last_used", "reason"])
+                    for _, file_path, size_mb, mtime, reason in records:
+                        writer.writerow([
+                            file_path,
+                            f"{size_mb:.2f}",
+                            datetime.fromtimestamp(mtime).strftime("%Y-%m-%d"),
+                            reason
+                        ])
+                        written += 1
+                self.update_status(f"Exported {written:,} results to {file_name}")
+            except OSError as e:
+                self.update_status(f"Export failed: {e}")
+        
+        threading.Thread(target=run, daemon=True).start()
+
+    def insert_result_row(self, file_path: str, size_mb: float, mtime: float, reason: str,
+                          position="end"):
+        """Adds an indexed result to the tree and its recommendation bank without touching disk"""
+        age_days = (time.time() - mtime) / (24 * 3600)
+        
+        self.file_tree.insert(
+            "",
+            position,
+            values=(
+                f"{size_mb:.2f}",
+                file_path,
+                datetime.fromtimestamp(mtime).strftime("%Y-%m-%d"),
+                f"{age_days:.0f}",
+                reason
+            ),
+            tags=('default',)
+        )
+        
+        category = self.get_recommendation_category(file_path, size_mb, age_days)
+        if category:
+            entry = f"{os.path.basename(file_path)} ({size_mb:.1f}MB) - {age_days:.0f} days old"
+            getattr(self, f'{category}_listbox').insert(position, entry)
+
     def create_recommendation_bank(self, parent):
         """Creates the smart recommendation bank panel"""
         bank_frame = tk.Frame(parent, bg=self.bg_color)
@@ -146,18 +2441,12 @@ class SmartStorageOptimizer:
         ).pack(fill='x', pady=5)
         
         # Create category frames with dark emerald styling
-        categories = [
-            ("unused_files", "Unused Files (180+ days)"),
-            ("large_files", "Large Files (1GB+)"),
-            ("old_files", "Old Downloads & Temp Files")
-        ]
-        
-        for cat_id, cat_name in categories:
+        for cat_id, cat_name in self.recommendation_bank_titles().items():
             frame = tk.Frame(bank_frame, bg=self.bg_color)
             frame.pack(fill='x', pady=5, padx=5)
             
             # Category header
-            tk.Label(
+            label = tk.Label(
                 frame,
                 text=cat_name,
                 bg=self.accent_color,
@@ -165,7 +2454,9 @@ class SmartStorageOptimizer:
                 font=('Arial', 10, 'bold'),
                 padx=5,
                 pady=2
-            ).pack(fill='x')
+            )
+            label.pack(fill='x')
+            setattr(self, f'{cat_id}_label', label)
             
             # Listbox for files
             listbox = tk.Listbox(
@@ -184,6 +2475,22 @@ class SmartStorageOptimizer:
             # Store listbox reference
             setattr(self, f'{cat_id}_listbox', listbox)
 
+    def recommendation_bank_titles(self) -> Dict[str, str]:
+        """Bank headers, worded from the active SizeAgeRule thresholds"""
+        rule = self.scan_engine.size_rule
+        large = (f"{rule.very_large_mb / 1000:g}GB" if rule.very_large_mb >= 1000
+                 else f"{rule.very_large_mb:g}MB")
+        return {
+            "unused_files": f"Unused Files ({rule.max_age_days:g}+ days)",
+            "large_files": f"Large Files ({large}+)",
+            "old_files": "Old Downloads & Temp Files",
+        }
+
+    def refresh_bank_titles(self):
+        """Rewords the bank headers after the thresholds change"""
+        for cat_id, cat_name in self.recommendation_bank_titles().items():
+            getattr(self, f'{cat_id}_label').config(text=cat_name)
+
     def create_itemized_list(self, parent):
         """Creates an organized itemized list with auto-scroll control"""
         list_frame = tk.Frame(parent, bg='white')
@@ -236,6 +2543,10 @@ class SmartStorageOptimizer:
             self.file_tree.column(col_id, width=width, minwidth=width)
             self.file_tree.heading(col_id, text=heading)
         
+        # Sorting pages through every result, including any spilled to disk
+        for col_id in ("size", "age"):
+            self.file_tree.heading(col_id, command=lambda c=col_id: self.sort_results(c))
+        
         # Add scrollbar
         scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.file_tree.yview)
         self.file_tree.configure(yscrollcommand=self.custom_scrollbar_set)
@@ -277,13 +2588,15 @@ class SmartStorageOptimizer:
             self.auto_scroll_enabled = True
             self.last_selected_item = None
 
-    def update_tree_item(self, file_path: str, size_mb: float, reason: str):
+    def update_tree_item(self, file_path: str, size_mb: float, reason: str,
+                         last_used_ts: Optional[float] = None):
         """Updates tree while respecting scroll position"""
         try:
-            # Get file stats
-            file_stat = os.stat(file_path)
-            last_used = datetime.fromtimestamp(file_stat.st_atime)
-            age_days = (time.time() - file_stat.st_atime) / (24 * 3600)
+            # Last use as seen by the scan (mtime or tracked open), not atime
+            if last_used_ts is None:
+                last_used_ts = os.stat(file_path).st_mtime
+            last_used = datetime.fromtimestamp(last_used_ts)
+            age_days = (time.time() - last_used_ts) / (24 * 3600)
             
             # Insert new item
             new_item = self.file_tree.insert(
@@ -302,6 +2615,11 @@ class SmartStorageOptimizer:
             # Configure tag
             self.file_tree.tag_configure('default', background='white', foreground='black')
             
+            # Only the newest rows stay in the tree; the rest are in the index
+            children = self.file_tree.get_children()
+            if len(children) > self.max_filter_rows:
+                self.file_tree.delete(*children[self.max_filter_rows:])
+            
             # Maintain selection if exists
             if self.last_selected_item and not self.auto_scroll_enabled:
                 self.file_tree.see(self.last_selected_item)
@@ -326,109 +2644,460 @@ class SmartStorageOptimizer:
             pady=10
         )
         self.workstation_button.pack(side='right')
+        
+        # Bulk archive of the current (filtered) results
+        self.archive_button = tk.Button(
+            self.workstation_frame,
+            text="Archive Filtered Results",
+            command=self.archive_filtered_results,
+            bg=self.button_bg,
+            fg=self.fg_color,
+            activebackground=self.highlight_color,
+            font=('Arial', 12, 'bold'),
+            padx=20,
+            pady=10
+        )
+        self.archive_button.pack(side='right', padx=10)
+        
+        format_menu = tk.OptionMenu(self.workstation_frame, self.archive_format, "tar.xz", "zip")
+        format_menu.config(
+            bg=self.button_bg,
+            fg=self.fg_color,
+            activebackground=self.highlight_color,
+            activeforeground=self.fg_color
+        )
+        format_menu.pack(side='right')
+        
+        tk.Label(
+            self.workstation_frame,
+            text="Archive as:",
+            bg=self.bg_color,
+            fg=self.fg_color,
+            font=('Arial', 11, 'bold')
+        ).pack(side='right', padx=5)
+        
+        tk.Button(
+            self.workstation_frame,
+            text="Export CSV",
+            command=self.export_results,
+            bg=self.button_bg,
+            fg=self.fg_color,
+            activebackground=self.highlight_color,
+            font=('Arial', 12, 'bold'),
+            padx=20,
+            pady=10
+        ).pack(side='left', padx=(0, 10))
+        
+        tk.Button(
+            self.workstation_frame,
+            text="Analytics",
+            command=self.open_analytics_dashboard,
+            bg=self.button_bg,
+            fg=self.fg_color,
+            activebackground=self.highlight_color,
+            font=('Arial', 12, 'bold'),
+            padx=20,
+            pady=10
+        ).pack(side='left')
+
+    def open_analytics_dashboard(self):
+        """Opens histograms, extension totals and savings for the last scan with live threshold sliders"""
+        if not len(self.scan_engine.file_columns):
+            messagebox.showinfo("Analytics", "Run a scan first!")
+            return
+        try:
+            analytics = ScanAnalytics(self.scan_engine.file_columns.to_numpy())
+        except ImportError:
+            messagebox.showerror("Analytics", "The analytics dashboard needs numpy (pip install numpy)")
+            return
+        
+        win = tk.Toplevel(self.root)
+        win.title("Scan Analytics")
+        win.geometry("1000x700")
+        win.configure(bg=self.bg_color)
+        
+        # Threshold sliders, defaulting to the rule currently in use
+        size_rule = self.scan_engine.size_rule
+        slider_frame = tk.Frame(win, bg=self.bg_color)
+        slider_frame.pack(fill='x', padx=10, pady=5)
+        sliders = {}
+        for key, label, low, high, value in [
+            ("max_age_days", "Unused after (days)", 7, 1825, size_rule.max_age_days),
+            ("large_mb", "Large file (MB)", 1, 2000, size_rule.large_mb),
+            ("very_large_mb", "Very large file (MB)", 10, 20000, size_rule.very_large_mb),
+        ]:
+            sliders[key] = tk.Scale(
+                slider_frame,
+                label=label,
+                from_=low,
+                to=high,
+                orient='horizontal',
+                length=250,
+                bg=self.accent_color,
+                fg=self.fg_color,
+                highlightthickness=0,
+                troughcolor=self.bg_color
+            )
+            sliders[key].set(value)
+            sliders[key].pack(side='left', padx=10)
+        
+        def apply_thresholds():
+            for key, slider in sliders.items():
+                setattr(size_rule, key, float(slider.get()))
+            self.refresh_bank_titles()
+            messagebox.showinfo("Analytics", "Thresholds will be used for the next scan.", parent=win)
+        
+        tk.Button(
+            slider_frame,
+            text="Apply to Next Scan",
+            command=apply_thresholds,
+            bg=self.button_bg,
+            fg=self.fg_color,
+            activebackground=self.highlight_color,
+            font=('Arial', 10, 'bold')
+        ).pack(side='left', padx=10)
+        
+        totals_label = tk.Label(
+            win,
+            bg=self.accent_color,
+            fg=self.fg_color,
+            font=('Arial', 11),
+            justify='left',
+            padx=10,
+            pady=5
+        )
+        totals_label.pack(fill='x', padx=10, pady=5)
+        
+        charts = tk.Frame(win, bg=self.bg_color)
+        charts.pack(fill='both', expand=True, padx=10, pady=5)
+        
+        # Size-by-age histogram (independent of thresholds, drawn once)
+        hist_canvas = tk.Canvas(charts, width=480, height=300, bg=self.accent_color, highlightthickness=0)
+        hist_canvas.grid(row=0, column=0, padx=5, pady=5)
+        self.draw_size_age_histogram(hist_canvas, analytics)
+        
+        ext_list = tk.Listbox(
+            charts,
+            bg=self.bg_color,
+            fg=self.fg_color,
+            font=('Courier', 10),
+            width=40,
+            height=16,
+            relief='solid',
+            borderwidth=1
+        )
+        ext_list.grid(row=0, column=1, padx=5, pady=5, sticky='ns')
+        
+        curve_canvas = tk.Canvas(charts, width=480, height=220, bg=self.accent_color, highlightthickness=0)
+        curve_canvas.grid(row=1, column=0, columnspan=2, padx=5, pady=5, sticky='we')
+        
+        def recompute(_=None):
+            category = analytics.categories(
+                float(sliders["very_large_mb"].get()),
+                float(sliders["large_mb"].get()),
+                float(sliders["max_age_days"].get())
+            )
+            totals = analytics.category_totals(category)
+            candidates = category != FileColumns.NONE
+            candidate_count = sum(totals[code][0] for code in range(1, 4))
+            candidate_mb = sum(totals[code][1] for code in range(1, 4))
+            totals_label.config(text=(
+                f"{len(category):,} files scanned - {candidate_count:,} candidates, "
+                f"{candidate_mb:,.1f}MB potential savings\n"
+                f"Unused: {totals[FileColumns.OLD][0]:,} ({totals[FileColumns.OLD][1]:,.1f}MB)   "
+                f"Very large: {totals[FileColumns.VERY_LARGE][0]:,} ({totals[FileColumns.VERY_LARGE][1]:,.1f}MB)   "
+                f"Large: {totals[FileColumns.LARGE][0]:,} ({totals[FileColumns.LARGE][1]:,.1f}MB)"
+            ))
+            
+            ext_list.delete(0, 'end')
+            ext_list.insert('end', "Candidate MB by extension")
+            for ext, size_mb in analytics.extension_totals(candidates):
+                ext_list.insert('end', f"{ext:<16}{size_mb:>14,.1f}")
+            
+            self.draw_savings_curve(curve_canvas, *analytics.savings_curve(candidates))
+        
+        for slider in sliders.values():
+            slider.config(command=recompute)
+        recompute()
+
+    def draw_size_age_histogram(self, canvas, analytics: ScanAnalytics):
+        """Draws a size (rows) by age (columns) heatmap of file counts"""
+        size_edges = [0, 1, 10, 100, 1000, float('inf')]
+        size_labels = ["<1MB", "1-10MB", "10-100MB", "100MB-1GB", "1GB+"]
+        age_edges = [0, 30, 90, 180, 365, 730, float('inf')]
+        age_labels = ["<30d", "30-90d", "90-180d", "180d-1y", "1-2y", "2y+"]
+        counts = analytics.size_age_histogram(size_edges, age_edges)
+        peak = max(int(counts.max()), 1)
+        
+        left, top, cell_w, cell_h = 80, 30, 65, 45
+        canvas.create_text(240, 12, text="Files by size and age", fill="#90EE90", font=('Arial', 10, 'bold'))
+        for col, label in enumerate(age_labels):
+            canvas.create_text(left + col * cell_w + cell_w // 2, top + len(size_labels) * cell_h + 12,
+                               text=label, fill=self.fg_color, font=('Arial', 8))
+        for row, label in enumerate(size_labels):
+            canvas.create_text(left - 5, top + row * cell_h + cell_h // 2, text=label,
+                               anchor='e', fill=self.fg_color, font=('Arial', 8))
+            for col in range(len(age_labels)):
+                count = int(counts[row, col])
+                shade = int(40 + 200 * (count / peak) ** 0.5) if count else 20
+                canvas.create_rectangle(
+                    left + col * cell_w, top + row * cell_h,
+                    left + (col + 1) * cell_w, top + (row + 1) * cell_h,
+                    fill=f"#10{shade:02x}10", outline=self.bg_color
+                )
+                canvas.create_text(left + col * cell_w + cell_w // 2, top + row * cell_h + cell_h // 2,
+                                   text=f"{count:,}", fill="white", font=('Arial', 8))
+
+    def draw_savings_curve(self, canvas, files, savings):
+        """Draws cumulative MB reclaimed against number of candidates handled, largest first"""
+        canvas.delete('all')
+        width = int(canvas.winfo_width()) if canvas.winfo_width() > 1 else int(canvas['width'])
+        height = int(canvas['height'])
+        canvas.create_text(10, 10, anchor='nw', text="Cumulative savings (largest first)",
+                           fill="#90EE90", font=('Arial', 10, 'bold'))
+        if not len(files):
+            return
+        
+        left, bottom, plot_w, plot_h = 40, height - 20, width - 60, height - 50
+        file_count = int(files[-1])
+        total = float(savings[-1]) or 1.0
+        points = [left, bottom]
+        for handled, value in zip(files, savings):
+            points.extend([left + plot_w * float(handled) / file_count,
+                           bottom - plot_h * float(value) / total])
+        if len(points) >= 4:
+            canvas.create_line(*points, fill="#90EE90", width=2)
+        canvas.create_text(left, bottom + 10, anchor='w', text="0",
+                           fill=self.fg_color, font=('Arial', 8))
+        canvas.create_text(left + plot_w, bottom + 10, anchor='e', text=f"{file_count:,} files",
+                           fill=self.fg_color, font=('Arial', 8))
+        canvas.create_text(left + plot_w, bottom - plot_h, anchor='se', text=f"{total:,.1f}MB",
+                           fill=self.fg_color, font=('Arial', 8))
+
+    def archive_filtered_results(self):
+        """Archives every recommendation matching the current search filter"""
+        if not self.local_actions_allowed():
+            return
+        rows = self.result_index.search(self.search_var.get().strip())
+        file_paths = [self.result_index.row(row)[0] for row in rows]
+        if not file_paths:
+            messagebox.showinfo("Archive", "No files to archive!")
+            return
+        
+        if messagebox.askyesno(
+            "Confirm Archive",
+            f"Compress {len(file_paths):,} files to .{self.archive_format.get()} "
+            f"and delete the originals once verified?"
+        ):
+            self.archive_files(file_paths)
+
+    def archive_files(self, file_paths: List[str],
+                      restore: Optional[Dict[str, Tuple[str, float, float, str]]] = None):
+        """Compresses files on a process pool in the background, reporting reclaimed space
+
+        restore maps a path to its index row; that row is re-added if archiving the file fails.
+        """
+        archive_format = self.archive_format.get()
+        
+        def run():
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            
+            # Archiving reads every file twice; don't let a usage tracker count that as use
+            if self.scan_engine.usage_store:
+                try:
+                    self.scan_engine.usage_store.ignore_opens(file_paths, seconds=3600)
+                except Exception:
+                    pass
+
+            start = time.time()
+            done = failed = 0
+            read_bytes = reclaimed_bytes = 0
+            with ProcessPoolExecutor(max_workers=self.archive_workers) as pool:
+                futures = {pool.submit(archive_file, path, archive_format): path
+                           for path in file_paths}
+                for future in as_completed(futures):
+                    try:
+                        _, original_size, archive_size = future.result()
+                    except Exception as e:
+                        failed += 1
+                        print(f"Error archiving {futures[future]}: {e}")
+                        if restore and futures[future] in restore:
+                            self.root.after(0, lambda r=restore[futures[future]]: self.result_index.add(*r))
+                        continue
+                    
+                    done += 1
+                    read_bytes += original_size
+                    reclaimed_bytes += original_size - archive_size
+                    self.root.after(0, lambda p=futures[future]: self.forget_recommendation(p))
+                    
+                    elapsed = max(time.time() - start, 1e-6)
+                    self.update_status(
+                        f"Archived {done:,}/{len(file_paths):,} files - "
+                        f"reclaimed {reclaimed_bytes / 1024**2:.1f}MB at "
+                        f"{read_bytes / 1024**2 / elapsed:.1f}MB/s"
+                    )
+            
+            summary = (f"Archived {done:,} files, reclaimed {reclaimed_bytes / 1024**2:.1f}MB "
+                       f"in {time.time() - start:.1f}s")
+            if failed:
+                summary += f" ({failed:,} failed)"
+            self.update_status(summary)
+        
+        self.update_status(f"Archiving {len(file_paths):,} files...")
+        threading.Thread(target=run, daemon=True).start()
+
+    def forget_recommendation(self, file_path: str):
+        """Drops a file that no longer exists from the recommendations and search index"""
+        self.result_index.discard(file_path)
 
     def start_smart_scan(self):
         """Initiates the smart scan process"""
+        if not self.drive_var.get():
+            messagebox.showinfo("No Drive", "Drives are still being detected, please wait.")
+            return
+        
         self.scan_button.config(state='disabled')
         self.status_label.config(text="Scanning in progress...")
-        self.recommendations = []
         
-        # Start scan in background thread
-        scan_thread = threading.Thread(target=self.perform_scan)
+        # Start scan in background thread, remotely if agents are configured
+        agents = [a.strip() for a in self.agents_var.get().split(',') if a.strip()]
+        self.showing_remote = bool(agents)
+        self.remote_index.clear()
+        self.clear_result_views()
+        self.archive_button.config(state='disabled' if agents else 'normal')
+        if agents:
+            self.workstation_button.config(state='disabled')
+            scan_thread = threading.Thread(target=self.perform_agent_scan, args=(agents,))
+        else:
+            scan_thread = threading.Thread(target=self.perform_scan)
         scan_thread.daemon = True
         scan_thread.start()
 
     def perform_scan(self):
         """Enhanced scanning process"""
-        drive = self.drive_var.get()
-        files_scanned = 0
-        total_size = 0
+        engine = self.scan_engine
         
-        for root, _, files in os.walk(drive):
-            for file in files:
-                try:
-                    file_path = os.path.join(root, file)
-                    files_scanned += 1
-                    
-                    # Get file info
-                    file_stat = os.stat(file_path)
-                    size_mb = file_stat.st_size / (1024 * 1024)
-                    age_days = (time.time() - file_stat.st_mtime) / (24 * 3600)
-                    
-                    # Check if file should be recommended
-                    reason = self.get_recommendation_reason(file_path, size_mb, age_days)
-                    if reason:
-                        self.recommendations.append((file_path, size_mb, reason))
-                        total_size += size_mb
-                        self.update_recommendations(files_scanned, total_size)
-                
-                except (PermissionError, OSError):
-                    continue
+        def add_recommendation(file_path, size_mb, last_used, reason):
+            self.update_recommendations(engine.files_scanned, engine.total_size,
+                                        (file_path, size_mb, last_used, reason))
+        
+        engine.scan(self.drive_var.get(), add_recommendation, self.update_status)
         
         # Scan complete
-        self.root.after(0, lambda: self.scan_complete(files_scanned, total_size))
+        self.root.after(0, lambda: self.scan_complete(engine.files_scanned, engine.total_size))
+
+    def perform_agent_scan(self, agents: List[str]):
+        """Runs the scan on remote agents and streams their recommendations into the views
+
+        Each agent entry is "[token@]host:port[=/path/to/scan]". Agents answer
+        from cached results when they have already scanned the path.
+        """
+        results = {}
+        
+        def scan_agent(entry):
+            address, _, path = entry.partition('=')
+            token, _, address = address.rpartition('@')
+            client = self.agent_clients.get(address)
+            if client is None:
+                client = self.agent_clients[address] = AgentClient(address, token)
+            path = path or "/"
+            try:
+                client.call("POST", "/scan", path=path)
+                batch = []
+                for rec in client.stream_recommendations(path=path, follow=1):
+                    batch.append((f"{address}:{rec['path']}", rec['size_mb'], rec['mtime'], rec['reason']))
+                    if len(batch) >= 200:
+                        self.root.after(0, lambda b=batch: self.add_remote_recommendations(b))
+                        batch = []
+                self.root.after(0, lambda b=batch: self.add_remote_recommendations(b))
+                results[address] = client.call("GET", "/status", path=path)
+            except (OSError, ValueError) as e:
+                self.update_status(f"Agent {address} failed: {e}")
+        
+        threads = [threading.Thread(target=scan_agent, args=(entry,), daemon=True) for entry in agents]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        files_scanned = sum(r["files_scanned"] for r in results.values())
+        total_size = sum(r["total_size_mb"] for r in results.values())
+        self.root.after(0, lambda: [
+            self.scan_button.config(state='normal'),
+            self.status_label.config(
+                text=f"Agent Scan Complete! ({len(results)}/{len(agents)} agents)\n"
+                     f"Files Scanned: {files_scanned:,}\n"
+                     f"Potential Space Savings: {total_size:.1f}MB\n"
+                     f"{self.remote_index.live_count():,} recommendations"
+            )
+        ])
+
+    def add_remote_recommendations(self, batch: List[Tuple[str, float, float, str]]):
+        """Indexes recommendations received from an agent and shows them"""
+        filtering = bool(self.search_var.get().strip())
+        if self.scan_engine.memory_budget.exceeded(len(self.remote_index.paths)):
+            self.remote_index.spill()
+        for file_path, size_mb, mtime, reason in batch:
+            self.remote_index.add(file_path, size_mb, mtime, reason)
+            if not filtering and len(self.file_tree.get_children()) < self.max_filter_rows:
+                self.insert_result_row(file_path, size_mb, mtime, reason, 0)
+        if filtering and not self.search_job:
+            self.on_search_changed()
+        if batch:
+            self.status_label.config(text=f"Received {self.remote_index.live_count():,} recommendations from agents...")
 
     def get_recommendation_reason(self, file_path: str, size_mb: float, age_days: float) -> str:
-        """Enhanced smart file detection"""
+        """Enhanced smart file detection using the cheap metadata rules"""
         try:
-            # Skip system directories and files
-            if any(sys_dir in file_path.lower() for sys_dir in [
-                'windows', 'program files', 'appdata', '$recycle.bin', 'system32'
-            ]):
-                return ""
-            
-            file_name = os.path.basename(file_path).lower()
-            
-            # Skip system files and temporary files
-            if file_name.startswith(('.', '$')) or file_name in ['desktop.ini', 'thumbs.db']:
-                return ""
-            
-            if size_mb >= 1000:  # Files larger than 1GB
-                return f"Very large file ({size_mb:.1f}MB)"
-            elif age_days > 180:  # Files not accessed in 6 months
-                return f"Old file, not accessed in {age_days:.0f} days"
-            elif size_mb >= 100:  # Files larger than 100MB
-                if any(ext in file_name for ext in ['.mp4', '.mov', '.avi', '.mkv']):
-                    return f"Large media file ({size_mb:.1f}MB)"
-                return f"Large file ({size_mb:.1f}MB)"
-            
-            return ""
+            return self.rule_pipeline.evaluate_cheap(file_path, size_mb, age_days) or ""
         except:
             return ""
 
+    def get_recommendation_category(self, file_path: str, size_mb: float, age_days: float) -> str:
+        """Picks the recommendation bank listbox a file belongs in"""
+        return self.scan_engine.get_recommendation_category(file_path, size_mb, age_days)
+
     def update_status(self, message: str):
         """Updates the status label"""
         self.root.after(0, lambda: self.status_label.config(text=message))
 
-    def update_recommendations(self, files_scanned: int, total_size: float):
+    def update_recommendations(self, files_scanned: int, total_size: float,
+                               latest: Optional[Tuple[str, float, float, str]] = None):
         """Real-time updates with better organization"""
+        if latest is None and self.recommendations:
+            latest = self.recommendations[-1]
+        
         def update_ui():
             # Update scan status
             self.status_label.config(text=f"Scanned {files_scanned:,} files...")
             
+            # While a filter is active, refresh the filtered view instead of appending
+            if self.search_var.get().strip():
+                if not self.search_job:
+                    self.on_search_changed()
             # Update tree and recommendation bank
-            if self.recommendations:
-                latest = self.recommendations[-1]
-                file_path, size_mb, reason = latest
+            elif latest:
+                file_path, size_mb, last_used, reason = latest
                 
                 # Update tree with better formatting
-                self.update_tree_item(file_path, size_mb, reason)
+                self.update_tree_item(file_path, size_mb, reason, last_used)
                 
                 # Update recommendation banks
                 file_name = os.path.basename(file_path)
-                age_days = (time.time() - os.path.getmtime(file_path)) / (24 * 3600)
+                age_days = (time.time() - last_used) / (24 * 3600)
                 entry = f"{file_name} ({size_mb:.1f}MB) - {age_days:.0f} days old"
                 
-                if age_days > 180:
-                    self.unused_files_listbox.insert(0, entry)
-                elif size_mb > 1000:
-                    self.large_files_listbox.insert(0, entry)
-                elif 'download' in file_path.lower() or file_path.endswith(('.tmp', '.temp')):
-                    self.old_files_listbox.insert(0, entry)
-                
-                # Enable workstation button if we have enough recommendations
-                if len(self.recommendations) >= 5:
-                    self.workstation_button.config(state='normal')
+                category = self.get_recommendation_category(file_path, size_mb, age_days)
+                if category:
+                    listbox = getattr(self, f'{category}_listbox')
+                    listbox.insert(0, entry)
+                    # Only the newest entries stay on screen; the rest are in the index
+                    if listbox.size() > self.max_filter_rows:
+                        listbox.delete(self.max_filter_rows, 'end')
+            
+            # Enable workstation button if we have enough recommendations
+            if len(self.recommendations) >= 5:
+                self.workstation_button.config(state='normal')
         
         # Update frequently but not too often to prevent GUI lag
         if files_scanned % 10 == 0 or files_scanned == 1:
@@ -451,6 +3120,8 @@ class SmartStorageOptimizer:
 
     def toggle_workstation_mode(self):
         """Toggles workstation mode with proper exit handling"""
+        if not self.workstation_active and not self.local_actions_allowed():
+            return
         if not self.workstation_active and self.recommendations:
             self.workstation_active = True
             self.current_batch_index = 0
@@ -497,7 +3168,7 @@ class SmartStorageOptimizer:
                 break
             
             rec = self.recommendations[start_idx + i]
-            file_path, size_mb, reason = rec
+            file_path, size_mb, last_used, reason = rec
             
             # Create window
             win = tk.Toplevel(self.root)
@@ -516,8 +3187,8 @@ class SmartStorageOptimizer:
                 font=('Arial', 14, 'bold')
             ).pack(pady=10)
             
-            # File details
-            age_days = (time.time() - os.path.getmtime(file_path)) / (24 * 3600)
+            # File details; age is from the last use the scan indexed
+            age_days = (time.time() - last_used) / (24 * 3600)
             details = (
                 f"Size: {size_mb:.1f} MB\n"
                 f"Age: {age_days:.0f} days\n"
@@ -542,6 +3213,7 @@ class SmartStorageOptimizer:
                 ("Delete", '#8B0000', 'delete'),
                 ("Move", '#1B4D3E', 'move'),
                 ("Copy", '#1B4D3E', 'copy'),
+                ("Archive", '#1B4D3E', 'archive'),
                 ("Skip", '#1B4D3E', 'skip')
             ]:
                 tk.Button(
@@ -550,11 +3222,11 @@ class SmartStorageOptimizer:
                     command=lambda f=file_path, w=win, a=action: self.process_action(a, f, w),
                     bg=btn_bg,
                     fg='white',
-                    width=8,
+                    width=7,
                     font=('Arial', 10, 'bold'),
                     relief='solid',
                     borderwidth=1
-                ).pack(side='left', padx=5)
+                ).pack(side='left', padx=2)
             
             self.recommendation_windows.append(win)
         
@@ -611,12 +3283,92 @@ class SmartStorageOptimizer:
         self.current_batch_index = 0
 
     def get_drives(self) -> List[str]:
-        """Gets available drives"""
+        """Gets available drives, giving each drive letter a short probe timeout"""
         if sys.platform == "win32":
-            return [f"{d}:\\" for d in "ABCDEFGHIJKLMNOPQRSTUVWXYZ" 
-                    if os.path.exists(f"{d}:")]
+            return [f"{d}:\\" for d in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+                    if self.call_with_timeout(os.path.exists, f"{d}:")]
         return ["/"]
 
+    @staticmethod
+    def call_with_timeout(func, *args, timeout: float = 2.0):
+        """Runs func on a daemon thread; returns None if it does not finish in time
+
+        Used for calls that can hang on disconnected network drives. Errors
+        raised by func (an unreadable mount, say) also come back as None.
+        """
+        result = []
+
+        def run():
+            try:
+                result.append(func(*args))
+            except Exception:
+                pass
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        worker.join(timeout)
+        return result[0] if result else None
+
+    def discover_drives(self):
+        """Finds drives in the background and adds them to the drive menu as they answer"""
+        try:
+            import psutil
+        except ImportError:
+            psutil = None
+
+        try:
+            partitions = psutil.disk_partitions(all=False) if psutil else []
+        except Exception:
+            partitions = []
+
+        if not partitions:
+            for drive in self.get_drives():
+                self.root.after(0, lambda d=drive: self.add_drive(d, ""))
+            self.root.after(0, self.drives_discovered)
+            return
+
+        remaining = [len(partitions)]
+        remaining_lock = threading.Lock()
+
+        def probe(part):
+            try:
+                # Skip empty card readers and optical drives
+                if sys.platform == "win32" and ('cdrom' in part.opts or not part.fstype):
+                    return
+                usage = self.call_with_timeout(psutil.disk_usage, part.mountpoint)
+                if usage is None:
+                    return
+                details = (f"{usage.free / 1024**3:.1f} GB free of "
+                           f"{usage.total / 1024**3:.1f} GB ({part.fstype})")
+                self.root.after(0, lambda: self.add_drive(part.mountpoint, details))
+            finally:
+                with remaining_lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    self.root.after(0, self.drives_discovered)
+
+        # Probe every partition at once so one slow drive doesn't delay the rest
+        for part in partitions:
+            threading.Thread(target=probe, args=(part,), daemon=True).start()
+
+    def drives_discovered(self):
+        """Called once every drive has answered or timed out"""
+        if not self.drive_labels:
+            self.drive_info_label.config(text="No drives found")
+
+    def add_drive(self, drive: str, details: str):
+        """Adds a discovered drive to the drive menu"""
+        if drive in self.drive_labels:
+            return
+        self.drive_labels[drive] = details
+        self.drive_menu['menu'].add_command(
+            label=f"{drive}  {details}".strip(),
+            command=lambda: self.drive_var.set(drive)
+        )
+        if not self.drive_var.get():
+            self.drive_var.set(drive)
+
     def run(self):
         """Starts the application"""
         self.root.mainloop()
@@ -630,7 +3382,7 @@ class SmartStorageOptimizer:
                 new_path = os.path.join(dest_dir, os.path.basename(file_path))
                 shutil.move(file_path, new_path)
                 window.destroy()
-                self.recommendations = [r for r in self.recommendations if r[0] != file_path]
+                self.forget_recommendation(file_path)
                 self.check_batch_complete()
         except Exception as e:
             messagebox.showerror("Error", f"Could not move file: {str(e)}")
@@ -644,7 +3396,7 @@ class SmartStorageOptimizer:
                 new_path = os.path.join(dest_dir, os.path.basename(file_path))
                 shutil.copy2(file_path, new_path)
                 window.destroy()
-                self.recommendations = [r for r in self.recommendations if r[0] != file_path]
+                self.forget_recommendation(file_path)
                 self.check_batch_complete()
         except Exception as e:
             messagebox.showerror("Error", f"Could not copy file: {str(e)}")
@@ -688,6 +3440,10 @@ class SmartStorageOptimizer:
                 self.move_file(file_path)
             elif action == 'copy':
                 self.copy_file(file_path)
+            elif action == 'archive':
+                # The item is dropped from the list below, so put it back if archiving fails
+                position = next(i for i, r in enumerate(self.recommendations) if r[0] == file_path)
+                self.archive_files([file_path], restore={file_path: self.result_index.nth(position)})
             
             # Find current recommendation index
             current_index = next(i for i, r in enumerate(self.recommendations) 
@@ -713,7 +3469,8 @@ class SmartStorageOptimizer:
                     window,
                     next_rec[0],  # file_path
                     next_rec[1],  # size_mb
-                    next_rec[2],  # reason
+                    next_rec[2],  # last_used
+                    next_rec[3],  # reason
                     window_index + 1  # position
                 )
             else:
@@ -731,7 +3488,7 @@ class SmartStorageOptimizer:
         except Exception as e:
             messagebox.showerror("Error", f"Error processing file: {str(e)}")
 
-    def display_recommendation(self, window, file_path, size_mb, reason, position):
+    def display_recommendation(self, window, file_path, size_mb, last_used, reason, position):
         """Displays recommendation content in window"""
         # Title
         tk.Label(
@@ -742,8 +3499,8 @@ class SmartStorageOptimizer:
             font=('Arial', 14, 'bold')
         ).pack(pady=10)
         
-        # File details
-        age_days = (time.time() - os.path.getmtime(file_path)) / (24 * 3600)
+        # File details; age is from the last use the scan indexed
+        age_days = (time.time() - last_used) / (24 * 3600)
         details = (
             f"Size: {size_mb:.1f} MB\n"
             f"Age: {age_days:.0f} days\n"
@@ -768,6 +3525,7 @@ class SmartStorageOptimizer:
             ("Delete", '#8B0000', lambda: self.process_action('delete', file_path, window)),
             ("Move", '#1B4D3E', lambda: self.process_action('move', file_path, window)),
             ("Copy", '#1B4D3E', lambda: self.process_action('copy', file_path, window)),
+            ("Archive", '#1B4D3E', lambda: self.process_action('archive', file_path, window)),
             ("Skip", '#1B4D3E', lambda: self.process_action('skip', file_path, window))
         ]
         
@@ -778,11 +3536,11 @@ class SmartStorageOptimizer:
                 command=cmd,
                 bg=bg,
                 fg='white',
-                width=8,
+                width=7,
                 font=('Arial', 10, 'bold'),
                 relief='solid',
                 borderwidth=1
-            ).pack(side='left', padx=5)
+            ).pack(side='left', padx=2)
 
     def show_context_menu(self, event):
         """Shows context menu on right-click"""
@@ -797,6 +3555,8 @@ class SmartStorageOptimizer:
 
     def context_delete_file(self):
         """Handles delete from context menu"""
+        if not self.local_actions_allowed():
+            return
         selected = self.file_tree.selection()
         if selected:
             item = selected[0]
@@ -812,6 +3572,8 @@ class SmartStorageOptimizer:
 
     def context_move_file(self):
         """Handles move from context menu"""
+        if not self.local_actions_allowed():
+            return
         selected = self.file_tree.selection()
         if selected:
             item = selected[0]
@@ -821,6 +3583,8 @@ class SmartStorageOptimizer:
 
     def context_copy_file(self):
         """Handles copy from context menu"""
+        if not self.local_actions_allowed():
+            return
         selected = self.file_tree.selection()
         if selected:
             item = selected[0]
@@ -834,5 +3598,61 @@ class SmartStorageOptimizer:
         pass
 
 if __name__ == "__main__":
-    app = SmartStorageOptimizer()
-    app.run()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="SmartDisk Sentinel storage optimizer")
+    parser.add_argument("--agent", action="store_true", help="run headless as a scan agent service")
+    parser.add_argument("--host", default="127.0.0.1", help="agent listen address")
+    parser.add_argument("--port", type=int, default=8765, help="agent listen port")
+    parser.add_argument("--token", default="", help="bearer token clients must send to the agent")
+    parser.add_argument("--schedule", action="append", default=[], metavar="PATH",
+                        help="agent: rescan PATH periodically in the background (repeatable)")
+    parser.add_argument("--interval", type=float, default=24, help="hours between scheduled scans")
+    parser.add_argument("--max-ops", type=float, default=500,
+                        help="stat/readdir calls per second allowed for scheduled scans")
+    parser.add_argument("--max-iowait", type=float, default=20,
+                        help="iowait %% above which scheduled scans back off")
+    parser.add_argument("--max-load", type=float, default=1.5,
+                        help="load average per core above which scheduled scans back off")
+    parser.add_argument("--track-usage", action="append", default=[], metavar="MOUNT",
+                        help="record real file opens under MOUNT (Linux; fanotify needs root)")
+    parser.add_argument("--usage-db", default="", help="usage tracker database path")
+    parser.add_argument("--memory-limit", type=float, default=1536,
+                        help="agent: RSS in MB above which scan results spill to disk")
+    args = parser.parse_args()
+    if args.max_ops <= 0:
+        parser.error("--max-ops must be greater than 0")
+    
+    usage_store = UsageStore(args.usage_db)
+    if not (args.track_usage or os.path.exists(usage_store.db_path)):
+        usage_store = None
+    
+    if args.track_usage:
+        tracker = UsageTracker(usage_store, args.track_usage)
+        if not args.agent:
+            # Tracking on its own runs in the foreground
+            try:
+                tracker.run()
+            except KeyboardInterrupt:
+                pass
+            sys.exit(0)
+        tracker.start()
+    
+    if args.agent:
+        agent = ScanAgent(args.host, args.port, args.token, usage_store,
+                          MemoryBudget(args.memory_limit))
+        if not args.token and not agent.is_loopback():
+            parser.error(f"refusing to listen on {args.host} without --token: "
+                         f"anyone on the network could list this host's files")
+        if args.schedule:
+            agent.schedule(
+                args.schedule,
+                args.interval,
+                ScanThrottle(args.max_ops, args.max_iowait, args.max_load)
+            )
+        # Exit normally on SIGTERM so atexit removes spill files
+        import signal
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        agent.serve_forever()
+    else:
+        app = SmartStorageOptimizer()
+        app.run()
\ No newline at end of file
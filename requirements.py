@@ -6,7 +6,8 @@ def install_requirements():
         'tkinter',  # Usually included with Python
         'pillow',   # For image handling
         'send2trash',  # For safe file deletion
-        'psutil'    # For system monitoring
+        'psutil',   # For system monitoring
+        'numpy'     # For scan analytics
     ]
     
     print("Installing requirements...")